@@ -1,6 +1,6 @@
 # streamlit_app.py
 import streamlit as st
-from main import chunk_all_pdfs, build_faiss_from_ocr, build_graph, enrich_graph_with_entities, answer_query
+from main import build_faiss_from_ocr, build_graph, enrich_graph_with_entities, answer_query
 from config import CHUNKING_METHODS
 from pdf_uploader import update_knowledge_base
 
@@ -176,15 +176,12 @@ with st.sidebar:
     if st.button("🚀 Run Full Ingestion Pipeline"):
         st.markdown("---")
         with st.spinner("Running pipeline..."):
-            st.write("Processing Documents...")
-            chunks = chunk_all_pdfs(method=chunk_method)
-            st.write(f"✅ Chunks: {len(chunks)}")
-
-            st.write("Updating Vector Index...")
-            index, metadata = build_faiss_from_ocr()
+            st.write("Processing Documents & Updating Vector Index...")
+            index, metadata = build_faiss_from_ocr(method=chunk_method)
+            st.write(f"✅ Chunks: {len(metadata)}")
             
             st.write("Building Graph...")
-            build_graph(chunks)
+            build_graph(metadata.all_chunks())
             enrich_graph_with_entities()
             st.write("✅ Entities extracted and graph enriched")
 
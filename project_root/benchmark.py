@@ -0,0 +1,481 @@
+# benchmark.py
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+import numpy as np
+from config import (
+    OCR_DPI,
+    OCR_LANG,
+    STARTUP_IMPORT_BUDGET_S,
+    STARTUP_ENTRY_POINTS,
+    VECTOR_DIM,
+    FAISS_TRAIN_SIZE,
+    FAISS_RERANK_FACTOR,
+    CHUNK_STORE_PATH
+)
+
+# -----------------------------
+# Helpers
+# -----------------------------
+def summarize_latencies(latencies: list) -> dict:
+    """Mean / p50 / p95 / p99 / max of a list of per-item latencies in seconds."""
+    ordered = sorted(latencies)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))] * 1000
+
+    return {
+        "n": len(ordered),
+        "mean_ms": statistics.mean(ordered) * 1000,
+        "p50_ms": statistics.median(ordered) * 1000,
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": ordered[-1] * 1000
+    }
+
+def print_table(rows: list, columns: list):
+    """Print a list of dicts as a fixed-width table."""
+    widths = {c: max(len(c), *(len(_fmt(r[c])) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for row in rows:
+        print("  ".join(_fmt(row[c]).ljust(widths[c]) for c in columns))
+
+def _fmt(value) -> str:
+    return f"{value:.2f}" if isinstance(value, float) else str(value)
+
+# -----------------------------
+# OCR Backends
+# -----------------------------
+def benchmark_ocr_backends(pdf_path: str, pages: int = 5, backends=("pytesseract", "tesserocr"),
+                           dpi: int = OCR_DPI, lang: str = OCR_LANG) -> list:
+    """
+    Compare per-page OCR latency of the OCR backends on the first `pages` pages of a PDF.
+    Pages are rendered once up front so only OCR is timed; engine startup is reported separately.
+    """
+    from ocr import iter_page_images, create_ocr_backend, get_page_count
+
+    pages = min(pages, get_page_count(pdf_path))
+    images = [image for _, image in iter_page_images(pdf_path, dpi=dpi, page_numbers=range(1, pages + 1))]
+    rows = []
+    for backend in backends:
+        t0 = time.perf_counter()
+        engine = create_ocr_backend(backend, lang)
+        startup = time.perf_counter() - t0
+        if engine.name != backend:
+            print(f"Skipping {backend}: not available")
+            engine.close()
+            continue
+
+        latencies = []
+        for image in images:
+            t0 = time.perf_counter()
+            engine.image_to_text(image)
+            latencies.append(time.perf_counter() - t0)
+        engine.close()
+        rows.append({"backend": backend, "startup_ms": startup * 1000, **summarize_latencies(latencies)})
+
+    print_table(rows, ["backend", "startup_ms", "n", "mean_ms", "p50_ms", "p95_ms", "max_ms"])
+    return rows
+
+# -----------------------------
+# ANN Recall / Latency
+# -----------------------------
+def load_corpus_vectors(limit: int = None) -> np.ndarray:
+    """Embeddings of the indexed chunk texts (through the embedding cache, so mostly no encoding)."""
+    from embeddings import load_faiss_index, encode_texts
+    from embedding_cache import get_embedding_cache
+
+    _, metadata = load_faiss_index()
+    count = len(metadata) if limit is None else min(limit, len(metadata))
+    return encode_texts([metadata.text(i) for i in range(count)], cache=get_embedding_cache())
+
+def synthetic_vectors(n: int, dim: int = VECTOR_DIM, clusters: int = 100, seed: int = 0) -> np.ndarray:
+    """Clustered random vectors, for benchmarking index types without a built corpus."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    return centers[rng.integers(0, clusters, n)] + 0.3 * rng.standard_normal((n, dim)).astype(np.float32)
+
+def benchmark_ann(vectors: np.ndarray, index_types=("flat", "ivf", "hnsw"), k: int = 10, n_queries: int = 200,
+                  nprobes=(1, 4, 16, 64), ef_searches=(16, 64, 256), seed: int = 0) -> list:
+    """
+    Recall@k against exact search, index memory and per-query latency for each
+    index type and search-time setting (nprobe for IVF, efSearch for HNSW).
+    Compressed types are measured with and without exact re-ranking.
+    n_queries vectors are held out of the index and used as the queries.
+    """
+    import faiss
+    from embeddings import new_faiss_index, search_parameters, is_compressed, rerank_exact
+
+    order = np.random.default_rng(seed).permutation(len(vectors))
+    queries = np.ascontiguousarray(vectors[order[:n_queries]], dtype=np.float32)
+    base = np.ascontiguousarray(vectors[order[n_queries:]], dtype=np.float32)
+    exact = faiss.IndexFlatL2(base.shape[1])
+    exact.add(base)
+    _, truth = exact.search(queries, k)
+
+    rows = []
+    for index_type in index_types:
+        t0 = time.perf_counter()
+        index = new_faiss_index(base.shape[1], index_type, base[:FAISS_TRAIN_SIZE])
+        index.add_with_ids(base, np.arange(len(base), dtype=np.int64))
+        build_s = time.perf_counter() - t0
+        index_mb = faiss.serialize_index(index).nbytes / (1024 * 1024)
+
+        kind = type(search_parameters(index, k)).__name__
+        if kind == "SearchParametersIVF":
+            settings = [("nprobe", n, {"nprobe": n}) for n in nprobes]
+        elif kind == "SearchParametersHNSW":
+            settings = [("efSearch", ef, {"ef_search": ef}) for ef in ef_searches]
+        else:
+            settings = [("-", "", {})]
+
+        for name, value, kwargs in settings:
+            for rerank in ((False, True) if is_compressed(index_type) else (False,)):
+                fetch_k = k * FAISS_RERANK_FACTOR if rerank else k
+                params = search_parameters(index, fetch_k, **kwargs)
+                latencies, hits = [], 0
+                for query, expected in zip(queries, truth):
+                    t0 = time.perf_counter()
+                    _, labels = index.search(query.reshape(1, -1), fetch_k, params=params)
+                    found = rerank_exact(query, labels[0], base, k)[0] if rerank else labels[0]
+                    latencies.append(time.perf_counter() - t0)
+                    hits += len(np.intersect1d(found, expected))
+                rows.append({"index": index_type, "param": f"{name}={value}" if value != "" else name,
+                             "rerank": "yes" if rerank else "no", f"recall@{k}": hits / (k * len(queries)),
+                             "index_mb": index_mb, "build_s": build_s, **summarize_latencies(latencies)})
+
+    print(f"{len(base)} vectors, {len(queries)} held-out queries, k={k}; "
+          f"float32 vectors: {base.nbytes / (1024 * 1024):.1f} MB")
+    print("index_mb is resident per worker; re-rank vectors are read from a shared memory-mapped vectors.npy")
+    print_table(rows, ["index", "param", "rerank", f"recall@{k}", "index_mb", "build_s",
+                       "mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+    return rows
+
+# -----------------------------
+# Batch vs. Single Query Search
+# -----------------------------
+def benchmark_batch_search(n_queries: int = 1000, top_k: int = 5, seed: int = 0) -> list:
+    """
+    Throughput of search_faiss called in a loop vs. one search_faiss_batch call,
+    end to end (encoding included), on the saved index with chunk texts as queries.
+    """
+    from embeddings import load_faiss_index, search_faiss, search_faiss_batch, get_model
+
+    index, metadata = load_faiss_index()
+    rng = np.random.default_rng(seed)
+    queries = [metadata.text(i) for i in rng.integers(0, len(metadata), n_queries)]
+    get_model()  # load the model outside the timed region
+
+    t0 = time.perf_counter()
+    loop_results = [search_faiss(q, index, metadata, top_k) for q in queries]
+    loop_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    batch_results = search_faiss_batch(queries, index, metadata, top_k)
+    batch_s = time.perf_counter() - t0
+
+    same = sum([h["chunk"]["chunk_id"] for h in a] == [h["chunk"]["chunk_id"] for h in b]
+               for a, b in zip(loop_results, batch_results))
+    rows = [
+        {"mode": "loop", "queries": n_queries, "total_s": loop_s, "queries_per_s": n_queries / loop_s},
+        {"mode": "batch", "queries": n_queries, "total_s": batch_s, "queries_per_s": n_queries / batch_s}
+    ]
+    print_table(rows, ["mode", "queries", "total_s", "queries_per_s"])
+    print(f"Speedup: {loop_s / batch_s:.1f}x; identical results for {same}/{n_queries} queries")
+    return rows
+
+# -----------------------------
+# Sharded Search Fan-Out
+# -----------------------------
+def benchmark_shards(vectors: np.ndarray, shard_counts=(1, 2, 4, 8), index_type: str = "flat", top_k: int = 10,
+                     n_queries: int = 200, threads: int = None, seed: int = 0) -> list:
+    """
+    Per-query latency of search_shards as the vectors are split over more shards,
+    searched by a thread pool (one thread per shard, up to `threads`), and how
+    often the merged top-k equals the single index's.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from chunk_store import ChunkStore
+    from embeddings import new_faiss_index
+    from sharded_index import search_shards
+
+    threads = threads or os.cpu_count() or 1
+    order = np.random.default_rng(seed).permutation(len(vectors))
+    queries = np.ascontiguousarray(vectors[order[:n_queries]], dtype=np.float32)
+    base = np.ascontiguousarray(vectors[order[n_queries:]], dtype=np.float32)
+    chunks = [{"doc_id": f"doc{i // 100}", "chunk_id": f"doc{i // 100}_chunk{i % 100}", "page_number": 1,
+               "text": ""} for i in range(len(base))]
+
+    rows, reference = [], None
+    for num_shards in shard_counts:
+        shards = []
+        for part in np.array_split(np.arange(len(base)), num_shards):
+            metadata = ChunkStore.from_chunks([chunks[i] for i in part])
+            index = new_faiss_index(base.shape[1], index_type, base[part][:FAISS_TRAIN_SIZE])
+            index.add_with_ids(base[part], np.asarray(metadata.ids, dtype=np.int64))
+            shards.append((index, metadata))
+
+        workers = min(threads, num_shards)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            search_shards(shards, queries[:1], top_k, executor)  # warm up the pool
+            latencies, results = [], []
+            for query in queries:
+                t0 = time.perf_counter()
+                results.append(search_shards(shards, query.reshape(1, -1), top_k, executor)[0])
+                latencies.append(time.perf_counter() - t0)
+
+        found = [[hit["chunk"]["chunk_id"] for hit in hits] for hits in results]
+        reference = reference or found
+        rows.append({"shards": num_shards, "threads": workers,
+                     "same_top_k": sum(a == b for a, b in zip(found, reference)) / len(found),
+                     **summarize_latencies(latencies)})
+
+    print(f"{len(base)} vectors ({index_type}), {len(queries)} queries, k={top_k}, {os.cpu_count()} cores")
+    print_table(rows, ["shards", "threads", "same_top_k", "mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+    return rows
+
+# -----------------------------
+# Filtered Search
+# -----------------------------
+def benchmark_filtered_search(vectors: np.ndarray, index_types=("flat", "ivf"), top_k: int = 10,
+                              n_queries: int = 200, docs: int = 1000, seed: int = 0) -> list:
+    """
+    Per-query latency and recall@k of in-index filtering (ChunkFilter -> IDSelector)
+    vs. no filter and vs. over-fetching 10x and filtering in Python, for filters
+    of decreasing selectivity. Vectors are spread over `docs` synthetic documents
+    of 10 pages each; recall is against exact search over the matching rows.
+    """
+    import faiss
+    from chunk_store import ChunkFilter, ChunkStore
+    from embeddings import new_faiss_index, search_vectors
+
+    def matches(chunk, chunk_filter):
+        """What callers did before: check each returned chunk dict in Python."""
+        first, last = chunk_filter.page_range or (None, None)
+        confidence = chunk["ocr_confidence"]
+        return ((chunk_filter.doc_ids is None or chunk["doc_id"] in chunk_filter.doc_ids)
+                and (first is None or chunk["page_number"] >= first)
+                and (last is None or chunk["page_number"] <= last)
+                and (chunk_filter.min_confidence is None
+                     or (confidence is not None and confidence >= chunk_filter.min_confidence)))
+
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(vectors))
+    queries = np.ascontiguousarray(vectors[order[:n_queries]], dtype=np.float32)
+    base = np.ascontiguousarray(vectors[order[n_queries:]], dtype=np.float32)
+    doc_of = rng.integers(0, docs, len(base))
+    metadata = ChunkStore.from_chunks({"doc_id": f"doc{d}", "chunk_id": f"doc{d}_p{i % 10 + 1}_c1_{i}",
+                                       "page_number": i % 10 + 1, "text": "",
+                                       "ocr_confidence": float(rng.uniform(50, 100))}
+                                      for i, d in enumerate(doc_of))
+    filters = [
+        ("none", None),
+        ("50% docs", ChunkFilter(doc_ids={f"doc{d}" for d in range(docs // 2)})),
+        ("pages 1-3", ChunkFilter(page_range=(1, 3))),
+        ("conf>=90", ChunkFilter(min_confidence=90)),
+        ("1% docs", ChunkFilter(doc_ids={f"doc{d}" for d in range(max(1, docs // 100))})),
+        ("1 doc, p1-5", ChunkFilter(doc_ids={"doc0"}, page_range=(1, 5)))
+    ]
+
+    rows = []
+    for index_type in index_types:
+        index = new_faiss_index(base.shape[1], index_type, base[:FAISS_TRAIN_SIZE])
+        index.add_with_ids(base, np.asarray(metadata.ids, dtype=np.int64))
+        for name, chunk_filter in filters:
+            mask = metadata.select(chunk_filter)
+            exact = faiss.IndexFlatL2(base.shape[1])
+            exact.add(base[mask])
+            _, truth = exact.search(queries, top_k)
+            truth_ids = [{metadata.chunk_id(row) for row in np.flatnonzero(mask)[t[t >= 0]]} for t in truth]
+
+            modes = [("in-index", chunk_filter, top_k)]
+            if chunk_filter is not None:
+                modes.append(("post-filter", None, top_k * 10))
+            for mode, search_filter, fetch_k in modes:
+                latencies, hits = [], 0
+                for query, expected in zip(queries, truth_ids):
+                    t0 = time.perf_counter()
+                    found = search_vectors(query.reshape(1, -1), index, metadata, fetch_k,
+                                           chunk_filter=search_filter)[0]
+                    if mode == "post-filter":
+                        found = [hit for hit in found if matches(hit["chunk"], chunk_filter)][:top_k]
+                    latencies.append(time.perf_counter() - t0)
+                    hits += len({hit["chunk"]["chunk_id"] for hit in found} & expected)
+                rows.append({"index": index_type, "filter": name, "matching": int(mask.sum()), "mode": mode,
+                             f"recall@{top_k}": hits / max(1, sum(len(e) for e in truth_ids)),
+                             **summarize_latencies(latencies)})
+
+    print(f"{len(base)} vectors, {len(queries)} queries, k={top_k}")
+    print_table(rows, ["index", "filter", "matching", "mode", f"recall@{top_k}", "mean_ms", "p50_ms", "p99_ms"])
+    return rows
+
+# -----------------------------
+# Serving Memory per Worker
+# -----------------------------
+def process_memory_mb() -> dict:
+    """This process's resident memory (Linux): total, private (anonymous), file-backed and proportional (PSS)."""
+    fields = {"VmRSS": "rss_mb", "RssAnon": "private_mb", "RssFile": "file_mb"}
+    memory = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            name = line.split(":")[0]
+            if name in fields:
+                memory[fields[name]] = int(line.split()[1]) / 1024
+    if os.path.exists("/proc/self/smaps_rollup"):
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    memory["pss_mb"] = int(line.split()[1]) / 1024
+    return memory
+
+def _serving_worker(path, mmap, n_queries, barrier, results):
+    from embeddings import load_faiss_index
+
+    baseline = process_memory_mb()
+    index, metadata = load_faiss_index(path, mmap=mmap)
+    queries = np.random.default_rng(os.getpid()).standard_normal((n_queries, index.d)).astype(np.float32)
+    _, labels = index.search(queries, 5)
+    for row in metadata.rows_for_ids(labels).ravel():
+        if row >= 0:
+            metadata[row]
+    # Sample while every worker holds its index, then exit together
+    barrier.wait()
+    memory = process_memory_mb()
+    results.put({name: memory[name] - baseline.get(name, 0.0) for name in memory})
+    barrier.wait()
+
+def benchmark_serving_memory(workers: int = 4, n_queries: int = 200, path: str = CHUNK_STORE_PATH) -> list:
+    """
+    Memory added by loading and querying the saved index in N concurrent worker
+    processes, private copies vs. read-only memory mapping. With mmap the
+    private memory per worker should stay flat and small; the mapped index is
+    file-backed and shared, so PSS (each page split between its sharers) falls
+    as workers are added.
+    """
+    import multiprocessing
+
+    ctx = multiprocessing.get_context("spawn")
+    rows = []
+    for mmap in (False, True):
+        barrier, results = ctx.Barrier(workers), ctx.Queue()
+        procs = [ctx.Process(target=_serving_worker, args=(path, mmap, n_queries, barrier, results))
+                 for _ in range(workers)]
+        for proc in procs:
+            proc.start()
+        samples = [results.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+        for worker, sample in enumerate(samples):
+            rows.append({"mode": "mmap" if mmap else "copy", "worker": worker,
+                         **{name: sample.get(name, 0.0) for name in ("rss_mb", "private_mb", "file_mb", "pss_mb")}})
+
+    print(f"Memory added per worker process ({workers} workers, index at {path})")
+    print_table(rows, ["mode", "worker", "rss_mb", "private_mb", "file_mb", "pss_mb"])
+    return rows
+
+# -----------------------------
+# Startup / Import Time
+# -----------------------------
+_IMPORT_TIMER = "import time; t0 = time.perf_counter(); import {module}; print(time.perf_counter() - t0)"
+
+def benchmark_startup(modules=STARTUP_ENTRY_POINTS, runs: int = 3, budget_s: float = STARTUP_IMPORT_BUDGET_S) -> list:
+    """
+    Cold-start import time of each entry point, each run in a fresh interpreter.
+    Heavy resources (models, drivers, indexes) must load lazily, so importing
+    a module should stay within budget_s; rows over budget are flagged.
+    """
+    cwd = Path(__file__).resolve().parent
+    rows = []
+    for module in modules:
+        timings = []
+        for _ in range(runs):
+            result = subprocess.run([sys.executable, "-c", _IMPORT_TIMER.format(module=module)],
+                                    cwd=cwd, capture_output=True, text=True)
+            if result.returncode != 0:
+                print(f"Importing {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+                break
+            timings.append(float(result.stdout.strip().splitlines()[-1]))
+        if not timings:
+            rows.append({"module": module, "best_ms": "-", "worst_ms": "-", "status": "error"})
+            continue
+        best, worst = min(timings), max(timings)
+        rows.append({"module": module, "best_ms": best * 1000, "worst_ms": worst * 1000,
+                     "status": "ok" if best <= budget_s else "OVER BUDGET"})
+
+    print(f"Import budget: {budget_s * 1000:.0f} ms")
+    print_table(rows, ["module", "best_ms", "worst_ms", "status"])
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hybrid LLM Knowledge Agent benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ocr_parser = subparsers.add_parser("ocr", help="Per-page latency of the OCR backends")
+    ocr_parser.add_argument("pdf_path", type=str, help="PDF to OCR")
+    ocr_parser.add_argument("--pages", type=int, default=5, help="Number of pages to benchmark")
+
+    startup_parser = subparsers.add_parser("startup", help="Cold import time of each entry point vs. budget")
+    startup_parser.add_argument("modules", nargs="*", default=STARTUP_ENTRY_POINTS, help="Modules to import")
+    startup_parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per module")
+    startup_parser.add_argument("--budget", type=float, default=STARTUP_IMPORT_BUDGET_S, help="Budget in seconds")
+
+    ann_parser = subparsers.add_parser("ann", help="Recall@k vs. exact search and latency per index type / setting")
+    ann_parser.add_argument("--types", nargs="+", default=["flat", "ivf", "hnsw"], help="Index types or factory strings")
+    ann_parser.add_argument("--k", type=int, default=10, help="Neighbours per query")
+    ann_parser.add_argument("--queries", type=int, default=200, help="Held-out query vectors")
+    ann_parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64], help="IVF nprobe values")
+    ann_parser.add_argument("--ef", type=int, nargs="+", default=[16, 64, 256], help="HNSW efSearch values")
+    ann_parser.add_argument("--limit", type=int, default=None, help="Use at most this many indexed chunks")
+    ann_parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic vectors instead of the corpus")
+
+    search_parser = subparsers.add_parser("search", help="Looped single-query vs. batch search throughput")
+    search_parser.add_argument("--queries", type=int, default=1000, help="Number of queries")
+    search_parser.add_argument("--top_k", type=int, default=5, help="Results per query")
+
+    shards_parser = subparsers.add_parser("shards", help="Query latency vs. number of shards searched in parallel")
+    shards_parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8], help="Shard counts")
+    shards_parser.add_argument("--type", type=str, default="flat", help="Index type of every shard")
+    shards_parser.add_argument("--k", type=int, default=10, help="Neighbours per query")
+    shards_parser.add_argument("--queries", type=int, default=200, help="Held-out query vectors")
+    shards_parser.add_argument("--threads", type=int, default=None, help="Search threads (default: all cores)")
+    shards_parser.add_argument("--limit", type=int, default=None, help="Use at most this many indexed chunks")
+    shards_parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic vectors instead of the corpus")
+
+    filter_parser = subparsers.add_parser("filter", help="Filtered vs. unfiltered vs. post-filtered search")
+    filter_parser.add_argument("--types", nargs="+", default=["flat", "ivf"], help="Index types or factory strings")
+    filter_parser.add_argument("--k", type=int, default=10, help="Neighbours per query")
+    filter_parser.add_argument("--queries", type=int, default=200, help="Held-out query vectors")
+    filter_parser.add_argument("--docs", type=int, default=1000, help="Synthetic documents the vectors belong to")
+    filter_parser.add_argument("--limit", type=int, default=None, help="Use at most this many indexed chunks")
+    filter_parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic vectors instead of the corpus")
+
+    memory_parser = subparsers.add_parser("memory", help="Per-worker memory of the served index, copy vs. mmap")
+    memory_parser.add_argument("--workers", type=int, default=4, help="Concurrent worker processes")
+    memory_parser.add_argument("--queries", type=int, default=200, help="Queries run by each worker")
+    memory_parser.add_argument("--path", type=str, default=CHUNK_STORE_PATH, help="Saved index directory")
+
+    args = parser.parse_args()
+    if args.command == "ocr":
+        benchmark_ocr_backends(args.pdf_path, pages=args.pages)
+    elif args.command == "ann":
+        vectors = synthetic_vectors(args.synthetic) if args.synthetic else load_corpus_vectors(args.limit)
+        benchmark_ann(vectors, args.types, k=args.k, n_queries=args.queries, nprobes=args.nprobe, ef_searches=args.ef)
+    elif args.command == "search":
+        benchmark_batch_search(args.queries, top_k=args.top_k)
+    elif args.command == "shards":
+        vectors = synthetic_vectors(args.synthetic) if args.synthetic else load_corpus_vectors(args.limit)
+        benchmark_shards(vectors, args.shards, index_type=args.type, top_k=args.k, n_queries=args.queries,
+                         threads=args.threads)
+    elif args.command == "filter":
+        vectors = synthetic_vectors(args.synthetic) if args.synthetic else load_corpus_vectors(args.limit)
+        benchmark_filtered_search(vectors, args.types, top_k=args.k, n_queries=args.queries, docs=args.docs)
+    elif args.command == "memory":
+        benchmark_serving_memory(args.workers, n_queries=args.queries, path=args.path)
+    elif args.command == "startup":
+        rows = benchmark_startup(args.modules, runs=args.runs, budget_s=args.budget)
+        # Non-zero exit so the budget can gate CI
+        sys.exit(0 if all(r["status"] == "ok" for r in rows) else 1)
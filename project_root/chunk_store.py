@@ -0,0 +1,329 @@
+# chunk_store.py
+import os
+import re
+import json
+import mmap
+import hashlib
+from array import array
+from collections import namedtuple
+from pathlib import Path
+import numpy as np
+
+# -----------------------------
+# Compact Chunk Metadata
+# -----------------------------
+# Row i of the store describes FAISS vector i. Instead of one dict per chunk:
+#   meta.json                 - interned document ids (each stored once), row count
+#   doc_index.npy             - int32 row -> position in doc_ids
+#   page_number.npy           - int32
+#   chunk_seq.npy             - int32, the trailing _N of the chunk id
+#   ocr_confidence.npy        - float32, NaN when unknown
+#   text_offsets.npy          - int64, row i's text is text.bin[offsets[i]:offsets[i+1]]
+#   text.bin                  - all chunk texts, UTF-8, back to back
+#   ids.npy                   - int64 stable FAISS id of each row (see chunk_faiss_id)
+#   vectors.npy               - optional float32 (rows, dim) embeddings, for exact re-ranking
+#   provenance.json           - row -> other locations of the same (deduplicated) text
+# Chunk ids follow <doc_id>_p<page>_c1_<seq> and are rebuilt on access; any id
+# that doesn't fit the pattern is kept verbatim in meta.json.
+
+_CHUNK_ID_RE = re.compile(r"^(?P<doc>.*)_p(?P<page>\d+)_c1_(?P<seq>\d+)$")
+_COLUMNS = ("doc_index", "page_number", "chunk_seq", "ocr_confidence", "text_offsets", "ids")
+
+def chunk_faiss_id(chunk_id: str) -> int:
+    """Stable 63-bit FAISS id of a chunk (FAISS ids are signed and -1 means "no result")."""
+    digest = hashlib.blake2b(chunk_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") & 0x7FFF_FFFF_FFFF_FFFF
+
+# Restricts a search to matching chunks; a None field matches everything.
+#   doc_ids        - collection of document ids (or a single id)
+#   page_range     - (first, last) page numbers, inclusive; either end may be None
+#   min_confidence - OCR confidence floor; chunks with unknown confidence don't match
+ChunkFilter = namedtuple("ChunkFilter", ["doc_ids", "page_range", "min_confidence"], defaults=(None, None, None))
+
+class ChunkStore:
+    """Columnar, read-mostly chunk metadata; store[i] returns the familiar chunk dict."""
+
+    def __init__(self, doc_ids, doc_index, page_number, chunk_seq, ocr_confidence, text_offsets,
+                 text_blob, irregular_chunk_ids=None, provenance=None, ids=None, vectors=None):
+        self.doc_ids = doc_ids
+        self.doc_index = doc_index
+        self.page_number = page_number
+        self.chunk_seq = chunk_seq
+        self.ocr_confidence = ocr_confidence
+        self.text_offsets = text_offsets
+        self.text_blob = text_blob
+        self.irregular_chunk_ids = irregular_chunk_ids or {}
+        self.provenance = provenance or {}
+        if ids is None:
+            ids = np.fromiter((chunk_faiss_id(self.chunk_id(i)) for i in range(len(page_number))),
+                              dtype=np.int64, count=len(page_number))
+        self.ids = ids
+        self.vectors = vectors
+        self._id_order = None
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """Build an in-memory store from chunk dicts (list or iterable)."""
+        builder = ChunkStoreBuilder()
+        for chunk in chunks:
+            builder.append(chunk)
+        return builder.build()
+
+    @classmethod
+    def concat(cls, stores):
+        """One in-memory store holding the rows of `stores` back to back (document ids re-interned)."""
+        doc_ids, positions = [], {}
+        columns = {name: [] for name in ("doc_index", "page_number", "chunk_seq", "ocr_confidence", "ids")}
+        offsets, blobs = [np.zeros(1, dtype=np.int64)], []
+        irregular, provenance = {}, {}
+        vectors = []
+        rows = blob_size = 0
+        for store in stores:
+            vectors.append(store.vectors)
+            for doc_id in store.doc_ids:
+                if doc_id not in positions:
+                    positions[doc_id] = len(doc_ids)
+                    doc_ids.append(doc_id)
+            remap = np.array([positions[d] for d in store.doc_ids], dtype=np.int32)
+            columns["doc_index"].append(remap[np.asarray(store.doc_index, dtype=np.int64)])
+            for name in ("page_number", "chunk_seq", "ocr_confidence", "ids"):
+                columns[name].append(np.asarray(getattr(store, name)))
+            offsets.append(np.asarray(store.text_offsets[1:]) + blob_size)
+            blobs.append(bytes(store.text_blob[:int(store.text_offsets[-1])]))
+            irregular.update({rows + k: v for k, v in store.irregular_chunk_ids.items()})
+            provenance.update({rows + k: v for k, v in store.provenance.items()})
+            rows += len(store)
+            blob_size += int(store.text_offsets[-1])
+        dtypes = {"doc_index": np.int32, "page_number": np.int32, "chunk_seq": np.int32,
+                  "ocr_confidence": np.float32, "ids": np.int64}
+        # Vectors are kept only if every part has them
+        has_vectors = bool(vectors) and all(v is not None for v in vectors)
+        return cls(doc_ids, text_offsets=np.concatenate(offsets), text_blob=b"".join(blobs),
+                   irregular_chunk_ids=irregular, provenance=provenance,
+                   vectors=np.concatenate([np.asarray(v, dtype=np.float32) for v in vectors]) if has_vectors else None,
+                   **{name: np.concatenate(parts).astype(dtypes[name]) if parts else np.empty(0, dtypes[name])
+                      for name, parts in columns.items()})
+
+    def take(self, rows) -> "ChunkStore":
+        """A new in-memory store with only `rows`, in that order; chunk ids, ids and provenance follow their rows."""
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = np.asarray(self.text_offsets)[rows]
+        ends = np.asarray(self.text_offsets)[rows + 1]
+        text_blob = b"".join(bytes(self.text_blob[int(s):int(e)]) for s, e in zip(starts, ends))
+        text_offsets = np.concatenate([[0], np.cumsum(ends - starts)]).astype(np.int64)
+        # Only documents that still have rows stay interned
+        used, doc_index = np.unique(np.asarray(self.doc_index)[rows], return_inverse=True)
+        new_rows = {int(old): new for new, old in enumerate(rows)}
+        return ChunkStore(
+            [self.doc_ids[i] for i in used],
+            doc_index.astype(np.int32),
+            np.asarray(self.page_number)[rows],
+            np.asarray(self.chunk_seq)[rows],
+            np.asarray(self.ocr_confidence)[rows],
+            text_offsets,
+            text_blob,
+            irregular_chunk_ids={new_rows[k]: v for k, v in self.irregular_chunk_ids.items() if k in new_rows},
+            provenance={new_rows[k]: v for k, v in self.provenance.items() if k in new_rows},
+            ids=np.asarray(self.ids)[rows],
+            vectors=None if self.vectors is None else np.asarray(self.vectors[rows], dtype=np.float32)
+        )
+
+    def rows_of_doc(self, doc_id: str) -> np.ndarray:
+        """Rows belonging to doc_id (empty if the document isn't in the store)."""
+        if doc_id not in self.doc_ids:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(np.asarray(self.doc_index) == self.doc_ids.index(doc_id))
+
+    def rows_for_ids(self, ids) -> np.ndarray:
+        """Map FAISS ids (search labels) to rows; unknown ids and -1 padding map to -1."""
+        if self._id_order is None:
+            # Built once per store: (sorted ids, their rows)
+            order = np.argsort(self.ids, kind="stable")
+            self._id_order = (np.asarray(self.ids)[order], order)
+        sorted_ids, order = self._id_order
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(self) == 0:
+            return np.full(ids.shape, -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(sorted_ids, ids), len(self) - 1)
+        return np.where(sorted_ids[positions] == ids, order[positions], -1)
+
+    def select(self, chunk_filter: ChunkFilter = None) -> np.ndarray:
+        """Boolean mask of the rows matching chunk_filter, computed on the columns (no chunk dicts built)."""
+        mask = np.ones(len(self), dtype=bool)
+        if chunk_filter is None:
+            return mask
+        if chunk_filter.doc_ids is not None:
+            doc_ids = {chunk_filter.doc_ids} if isinstance(chunk_filter.doc_ids, str) else set(chunk_filter.doc_ids)
+            wanted = np.fromiter((doc_id in doc_ids for doc_id in self.doc_ids), dtype=bool, count=len(self.doc_ids))
+            mask &= wanted[np.asarray(self.doc_index)]
+        if chunk_filter.page_range is not None:
+            first, last = chunk_filter.page_range
+            pages = np.asarray(self.page_number)
+            if first is not None:
+                mask &= pages >= first
+            if last is not None:
+                mask &= pages <= last
+        if chunk_filter.min_confidence is not None:
+            # NaN (unknown confidence) compares False
+            mask &= np.asarray(self.ocr_confidence) >= chunk_filter.min_confidence
+        return mask
+
+    def __len__(self):
+        return len(self.page_number)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, i):
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"chunk row {i} out of range")
+        return {
+            "doc_id": self.doc_id(i),
+            "chunk_id": self.chunk_id(i),
+            "page_number": int(self.page_number[i]),
+            "text": self.text(i),
+            "ocr_confidence": self.confidence(i)
+        }
+
+    def doc_id(self, i) -> str:
+        return self.doc_ids[int(self.doc_index[i])]
+
+    def chunk_id(self, i) -> str:
+        i = int(i)
+        if i in self.irregular_chunk_ids:
+            return self.irregular_chunk_ids[i]
+        return f"{self.doc_id(i)}_p{int(self.page_number[i])}_c1_{int(self.chunk_seq[i])}"
+
+    def text(self, i) -> str:
+        start, end = int(self.text_offsets[i]), int(self.text_offsets[i + 1])
+        return bytes(self.text_blob[start:end]).decode("utf-8")
+
+    def confidence(self, i):
+        value = float(self.ocr_confidence[i])
+        return None if np.isnan(value) else value
+
+    def locations(self, i) -> list:
+        """Every place row i's text occurs: its own location plus any collapsed duplicates."""
+        i = int(i)
+        own = {"doc_id": self.doc_id(i), "chunk_id": self.chunk_id(i), "page_number": int(self.page_number[i])}
+        return [own] + self.provenance.get(i, [])
+
+    def all_chunks(self):
+        """Yield a chunk dict for every location, duplicates included (what the corpus held before dedup)."""
+        for i in range(len(self)):
+            text, confidence = self.text(i), self.confidence(i)
+            for location in self.locations(i):
+                yield {**location, "text": text, "ocr_confidence": confidence}
+
+    def save(self, path):
+        """Write the store as a directory of .npy columns, a text blob and meta.json."""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in _COLUMNS:
+            np.save(path / f"{name}.npy", np.asarray(getattr(self, name)))
+        if self.vectors is not None:
+            np.save(path / "vectors.npy", np.asarray(self.vectors, dtype=np.float32))
+        with open(path / "text.bin", "wb") as f:
+            f.write(self.text_blob)
+        with open(path / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({
+                "version": 2,
+                "count": len(self),
+                "doc_ids": list(self.doc_ids),
+                "irregular_chunk_ids": {str(k): v for k, v in self.irregular_chunk_ids.items()}
+            }, f, ensure_ascii=False)
+        with open(path / "provenance.json", "w", encoding="utf-8") as f:
+            json.dump({str(k): v for k, v in self.provenance.items()}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path, mmap_mode: bool = True):
+        """
+        Open a saved store. With mmap_mode the columns and text blob are
+        memory-mapped, so loading is O(number of documents) and texts are only
+        paged in for the rows actually read.
+        """
+        path = Path(path)
+        with open(path / "meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        use_mmap = mmap_mode and meta["count"] > 0
+        # Version 1 stores predate ids.npy; ids are then recomputed from the chunk ids
+        columns = {name: np.load(path / f"{name}.npy", mmap_mode="r" if use_mmap else None)
+                   for name in _COLUMNS + ("vectors",) if (path / f"{name}.npy").exists()}
+        text_file = path / "text.bin"
+        if use_mmap and os.path.getsize(text_file) > 0:
+            with open(text_file, "rb") as f:
+                text_blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            with open(text_file, "rb") as f:
+                text_blob = f.read()
+        provenance = {}
+        if (path / "provenance.json").exists():
+            with open(path / "provenance.json", "r", encoding="utf-8") as f:
+                provenance = {int(k): v for k, v in json.load(f).items()}
+        return cls(meta["doc_ids"], text_blob=text_blob,
+                   irregular_chunk_ids={int(k): v for k, v in meta["irregular_chunk_ids"].items()},
+                   provenance=provenance, **columns)
+
+class ChunkStoreBuilder:
+    """Accumulates chunk dicts into compact typed buffers; build() returns a ChunkStore."""
+
+    def __init__(self):
+        self._doc_positions = {}
+        self.doc_ids = []
+        self.doc_index = array("i")
+        self.page_number = array("i")
+        self.chunk_seq = array("i")
+        self.ocr_confidence = array("f")
+        self.text_offsets = array("q", [0])
+        self.text_blob = bytearray()
+        self.ids = array("q")
+        self.vectors = []
+        self.irregular_chunk_ids = {}
+
+    def __len__(self):
+        return len(self.page_number)
+
+    def append(self, chunk):
+        doc_id = chunk["doc_id"]
+        if doc_id not in self._doc_positions:
+            self._doc_positions[doc_id] = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+        page_number = int(chunk["page_number"])
+
+        match = _CHUNK_ID_RE.match(chunk["chunk_id"])
+        if match and match.group("doc") == doc_id and int(match.group("page")) == page_number:
+            seq = int(match.group("seq"))
+        else:
+            seq = -1
+            self.irregular_chunk_ids[len(self)] = chunk["chunk_id"]
+
+        confidence = chunk.get("ocr_confidence")
+        self.doc_index.append(self._doc_positions[doc_id])
+        self.page_number.append(page_number)
+        self.chunk_seq.append(seq)
+        self.ocr_confidence.append(float("nan") if confidence is None else confidence)
+        self.text_blob += chunk["text"].encode("utf-8")
+        self.text_offsets.append(len(self.text_blob))
+        self.ids.append(chunk_faiss_id(chunk["chunk_id"]))
+
+    def append_vectors(self, vectors):
+        """Keep the embeddings of the rows just appended (row-aligned, for exact re-ranking)."""
+        self.vectors.append(np.asarray(vectors, dtype=np.float32))
+
+    def build(self) -> ChunkStore:
+        return ChunkStore(
+            self.doc_ids,
+            np.array(self.doc_index, dtype=np.int32),
+            np.array(self.page_number, dtype=np.int32),
+            np.array(self.chunk_seq, dtype=np.int32),
+            np.array(self.ocr_confidence, dtype=np.float32),
+            np.array(self.text_offsets, dtype=np.int64),
+            bytes(self.text_blob),
+            dict(self.irregular_chunk_ids),
+            ids=np.array(self.ids, dtype=np.int64),
+            vectors=np.concatenate(self.vectors) if self.vectors else None
+        )
@@ -1,10 +1,29 @@
 # chunking.py
 import os
+import threading
 from pathlib import Path
-import re
-from typing import List, Dict
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from typing import List, Dict, Iterable, Iterator
+import numpy as np
 from nltk import sent_tokenize
-from config import OCR_CHUNKS_FOLDER, CHUNKING_METHODS
+from config import (
+    OCR_CHUNKS_FOLDER,
+    CHUNKING_METHODS,
+    EMBEDDING_MODEL_NAME,
+    EMBEDDING_MAX_TOKENS,
+    TOKEN_WINDOW_SIZE,
+    TOKEN_WINDOW_OVERLAP,
+    SEMANTIC_BREAKPOINT_PERCENTILE,
+    SEMANTIC_MIN_CHARS,
+    SEMANTIC_MAX_CHARS,
+    SEMANTIC_ENCODE_BATCH_SIZE,
+    EMBEDDING_CACHE_ENABLED,
+    CHUNKING_WORKERS,
+    INGEST_BATCH_SIZE
+)
+from ocr_store import iter_document_pages
 
 # -----------------------------
 # Helper Functions
@@ -31,10 +50,129 @@ def fixed_length_chunking(text: str, chunk_size: int = 500) -> List[str]:
     """
     return [text[i:i+chunk_size] for i in range(0, len(text), chunk_size)]
 
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+
+def get_tokenizer():
+    """Load the embedding model's tokenizer on first use (thread-safe)."""
+    global _tokenizer
+    if _tokenizer is None:
+        with _tokenizer_lock:
+            if _tokenizer is None:
+                from transformers import AutoTokenizer
+                # SentenceTransformer resolves bare names under the sentence-transformers org
+                name = EMBEDDING_MODEL_NAME if "/" in EMBEDDING_MODEL_NAME else f"sentence-transformers/{EMBEDDING_MODEL_NAME}"
+                _tokenizer = AutoTokenizer.from_pretrained(name)
+    return _tokenizer
+
+def token_window_chunking(text: str, window_tokens: int = TOKEN_WINDOW_SIZE,
+                          overlap_tokens: int = TOKEN_WINDOW_OVERLAP) -> List[str]:
+    """
+    Pack sentences into windows of at most window_tokens embedding-model tokens.
+    Consecutive windows share up to overlap_tokens worth of whole sentences.
+    A sentence longer than a window is split on token boundaries.
+    All sentences are tokenized in one batched call to the fast tokenizer.
+    """
+    # Leave room for [CLS]/[SEP] so the encoder never truncates
+    window_tokens = min(window_tokens, EMBEDDING_MAX_TOKENS - 2)
+    sentences = sent_tokenize(text)
+    if not sentences:
+        return []
+
+    encoded = get_tokenizer()(sentences, add_special_tokens=False, return_offsets_mapping=True)
+
+    # (text, token_count) units, each fitting in one window
+    units = []
+    for sentence, ids, offsets in zip(sentences, encoded["input_ids"], encoded["offset_mapping"]):
+        if len(ids) <= window_tokens:
+            units.append((sentence, len(ids)))
+            continue
+        for start in range(0, len(ids), window_tokens):
+            end = min(start + window_tokens, len(ids))
+            units.append((sentence[offsets[start][0]:offsets[end - 1][1]], end - start))
+
+    chunks = []
+    current, current_tokens = [], 0
+    for unit in units:
+        if current and current_tokens + unit[1] > window_tokens:
+            chunks.append(" ".join(u[0] for u in current))
+            # Carry trailing sentences into the next window as overlap
+            carried, carried_tokens = [], 0
+            for prev in reversed(current[1:]):
+                if carried_tokens + prev[1] > overlap_tokens or carried_tokens + prev[1] + unit[1] > window_tokens:
+                    break
+                carried.insert(0, prev)
+                carried_tokens += prev[1]
+            current, current_tokens = carried, carried_tokens
+        current.append(unit)
+        current_tokens += unit[1]
+    if current:
+        chunks.append(" ".join(u[0] for u in current))
+    return chunks
+
+def encode_sentences(sentences: List[str]) -> np.ndarray:
+    """
+    Embed sentences with the already loaded embedding model, in large batches,
+    through the embedding cache so re-chunking unchanged text costs no encoding.
+    Returns L2-normalized float32 vectors, so dot products are cosine similarities.
+    """
+    # Imported here: embeddings imports this module
+    from embeddings import encode_texts
+    from embedding_cache import get_embedding_cache
+    cache = get_embedding_cache() if EMBEDDING_CACHE_ENABLED else None
+    vectors = encode_texts(sentences, batch_size=SEMANTIC_ENCODE_BATCH_SIZE, cache=cache)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def semantic_chunking_many(texts: List[str], percentile: float = SEMANTIC_BREAKPOINT_PERCENTILE,
+                           min_chars: int = SEMANTIC_MIN_CHARS,
+                           max_chars: int = SEMANTIC_MAX_CHARS) -> List[List[str]]:
+    """
+    Semantic chunking for several texts (e.g. all pages of a document) with a
+    single encode pass over all their sentences.
+    Within each text, a chunk ends where the cosine similarity between adjacent
+    sentences falls below the given percentile of that text's similarities,
+    provided the chunk has reached min_chars; it always ends before exceeding max_chars.
+    """
+    sentences_per_text = [sent_tokenize(text) for text in texts]
+    all_sentences = [s for sentences in sentences_per_text for s in sentences]
+    if not all_sentences:
+        return [[] for _ in texts]
+    embeddings = encode_sentences(all_sentences)
+
+    results = []
+    start = 0
+    for sentences in sentences_per_text:
+        vectors = embeddings[start:start + len(sentences)]
+        start += len(sentences)
+        if len(sentences) <= 1:
+            results.append(sentences)
+            continue
+
+        # similarity[i] is between sentence i and i + 1
+        similarity = np.einsum("ij,ij->i", vectors[:-1], vectors[1:])
+        breakpoints = similarity < np.percentile(similarity, percentile)
+
+        chunks, current, current_len = [], [sentences[0]], len(sentences[0])
+        for i, sentence in enumerate(sentences[1:]):
+            too_long = current_len + 1 + len(sentence) > max_chars
+            if too_long or (breakpoints[i] and current_len >= min_chars):
+                chunks.append(" ".join(current))
+                current, current_len = [], -1
+            current.append(sentence)
+            current_len += 1 + len(sentence)
+        chunks.append(" ".join(current))
+        results.append(chunks)
+    return results
+
+def semantic_chunking(text: str) -> List[str]:
+    """Split text where adjacent-sentence embedding similarity drops (see semantic_chunking_many)."""
+    return semantic_chunking_many([text])[0]
+
 def chunk_text(text: str, method: str = "sentence", chunk_size: int = 500) -> List[str]:
     """
     Chunk text based on selected method.
-    method: sentence | paragraph | fixed_length
+    method: sentence | paragraph | fixed_length | token_window | semantic
     """
     if method == "sentence":
         return sentence_chunking(text)
@@ -42,6 +180,10 @@ def chunk_text(text: str, method: str = "sentence", chunk_size: int = 500) -> Li
         return paragraph_chunking(text)
     elif method == "fixed_length":
         return fixed_length_chunking(text, chunk_size)
+    elif method == "token_window":
+        return token_window_chunking(text)
+    elif method == "semantic":
+        return semantic_chunking(text)
     else:
         raise ValueError(f"Unknown chunking method: {method}")
 
@@ -49,46 +191,96 @@ def chunk_text(text: str, method: str = "sentence", chunk_size: int = 500) -> Li
 # Main Chunking Function
 # -----------------------------
 
-def chunk_pdf_texts(pdf_folder: str, method: str = "sentence", chunk_size: int = 500) -> List[Dict]:
+def iter_pdf_chunks(pdf_folder: str, method: str = "sentence", chunk_size: int = 500) -> Iterator[Dict]:
     """
-    Read all OCR text files for a PDF and return chunk dictionaries.
-    Returns a list of dicts with keys: doc_id, chunk_id, page_number, text
+    Lazily yield chunk dictionaries for one PDF's OCR text
+    (packed .ocrpack or per-page .txt files), page by page.
+    Each dict has keys: doc_id, chunk_id, page_number, text, ocr_confidence
+    (mean tesseract word confidence of the page; None for text-layer or legacy pages)
     """
     pdf_name = Path(pdf_folder).name
-    chunks_list = []
-
-    text_files = sorted([f for f in os.listdir(pdf_folder) if f.endswith(".txt")])
-    
-    for txt_file in text_files:
-        text_path = Path(pdf_folder) / txt_file
-        text = read_text_file(text_path)
+    pages = iter_document_pages(pdf_folder)
 
-        # Chunking
-        sub_chunks = chunk_text(text, method=method, chunk_size=chunk_size)
+    if method == "semantic":
+        # Embed the whole document's sentences in one batched pass instead of page by page
+        pages = list(pages)
+        paged_chunks = zip(pages, semantic_chunking_many([page["text"] for page in pages]))
+    else:
+        paged_chunks = ((page, chunk_text(page["text"], method=method, chunk_size=chunk_size)) for page in pages)
 
+    for page, sub_chunks in paged_chunks:
         for i, chunk_text_content in enumerate(sub_chunks):
-            chunk_dict = {
+            yield {
                 "doc_id": pdf_name,
-                "chunk_id": f"{txt_file.split('.txt')[0]}_{i+1}",
-                "page_number": int(re.search(r"_p(\d+)_", txt_file).group(1)),
-                "text": chunk_text_content
+                "chunk_id": f"{page['stem']}_{i+1}",
+                "page_number": page["page_number"],
+                "text": chunk_text_content,
+                "ocr_confidence": page.get("confidence")
             }
-            chunks_list.append(chunk_dict)
 
-    return chunks_list
+def chunk_pdf_texts(pdf_folder: str, method: str = "sentence", chunk_size: int = 500) -> List[Dict]:
+    """
+    Read all OCR text for a PDF and return chunk dictionaries.
+    Returns a list of dicts with keys: doc_id, chunk_id, page_number, text, ocr_confidence
+    """
+    return list(iter_pdf_chunks(pdf_folder, method=method, chunk_size=chunk_size))
+
+def list_pdf_dirs(ocr_base_folder: str = OCR_CHUNKS_FOLDER) -> List[str]:
+    """OCR output folders (one per PDF), in sorted name order."""
+    pdf_folders = sorted(f for f in os.listdir(ocr_base_folder) if os.path.isdir(os.path.join(ocr_base_folder, f)))
+    return [os.path.join(ocr_base_folder, pdf_name) for pdf_name in pdf_folders]
+
+def iter_chunks(ocr_base_folder: str = OCR_CHUNKS_FOLDER,
+                method: str = "sentence",
+                chunk_size: int = 500,
+                workers: int = CHUNKING_WORKERS,
+                pdf_dirs: List[str] = None) -> Iterator[Dict]:
+    """
+    Lazily yield chunk dictionaries for all PDFs inside OCR_CHUNKS_FOLDER,
+    document by document, so consumers can work in bounded batches.
+    With workers > 1, documents are chunked in parallel worker processes with
+    at most 2 * workers documents' chunks buffered at a time.
+    Documents are processed in sorted name order either way, so the yielded
+    chunks (and their chunk_ids) are identical in serial and parallel mode.
+    pdf_dirs restricts chunking to those OCR folders (default: all of them).
+    method="semantic" always runs in this process: it encodes with the already
+    loaded embedding model, which workers would each have to load again.
+    """
+    if pdf_dirs is None:
+        pdf_dirs = list_pdf_dirs(ocr_base_folder)
+
+    if workers > 1 and len(pdf_dirs) > 1 and method != "semantic":
+        chunk_one = partial(chunk_pdf_texts, method=method, chunk_size=chunk_size)
+        with ProcessPoolExecutor(max_workers=min(workers, len(pdf_dirs))) as executor:
+            # Bounded look-ahead instead of executor.map, which would buffer the whole corpus
+            pending = deque()
+            for pdf_dir in pdf_dirs:
+                pending.append(executor.submit(chunk_one, pdf_dir))
+                if len(pending) >= 2 * workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+    else:
+        for pdf_dir in pdf_dirs:
+            yield from iter_pdf_chunks(pdf_dir, method=method, chunk_size=chunk_size)
 
 def chunk_all_pdfs(ocr_base_folder: str = OCR_CHUNKS_FOLDER,
                    method: str = "sentence",
-                   chunk_size: int = 500) -> List[Dict]:
+                   chunk_size: int = 500,
+                   workers: int = CHUNKING_WORKERS) -> List[Dict]:
     """
     Chunk all PDFs inside OCR_CHUNKS_FOLDER
+    Materializes iter_chunks(); prefer iter_chunks for large corpora.
     """
-    pdf_folders = [f for f in os.listdir(ocr_base_folder) if os.path.isdir(os.path.join(ocr_base_folder, f))]
-    all_chunks = []
-
-    for pdf_name in pdf_folders:
-        pdf_dir = os.path.join(ocr_base_folder, pdf_name)
-        pdf_chunks = chunk_pdf_texts(pdf_dir, method=method, chunk_size=chunk_size)
-        all_chunks.extend(pdf_chunks)
+    return list(iter_chunks(ocr_base_folder, method=method, chunk_size=chunk_size, workers=workers))
 
-    return all_chunks
+def iter_batches(items: Iterable, batch_size: int = INGEST_BATCH_SIZE) -> Iterator[List]:
+    """Group any iterable into lists of at most batch_size items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -13,13 +13,57 @@ NEO4J_PASSWORD = "Neo4j123!"
 # -----------------------------
 EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"  # lightweight model
 VECTOR_DIM = 384                           # embedding dimension
+EMBEDDING_BATCH_SIZE = 64                  # texts per model.encode call (length-sorted)
 FAISS_INDEX_PATH = "/Users/dev/Downloads/ADEO AI Assessment/HybridLLM_Knowledge_Agent/faiss_index.idx"
 FAISS_METADATA_PATH = "/Users/dev/Downloads/ADEO AI Assessment/HybridLLM_Knowledge_Agent/faiss_metadata.json"
+CHUNK_STORE_PATH = "/Users/dev/Downloads/ADEO AI Assessment/HybridLLM_Knowledge_Agent/faiss_chunk_store"  # index.faiss + compact metadata (supersede the files above)
+EMBEDDING_CACHE_ENABLED = True             # reuse embeddings of unchanged chunk texts across builds
+EMBEDDING_CACHE_DIR = os.path.join(os.path.dirname(FAISS_INDEX_PATH), "embedding_cache")
+EMBEDDING_CACHE_KEEP_GENERATIONS = 3       # GC entries not used by any of the last N builds
+
+# -----------------------------
+# ANN Index Config
+# -----------------------------
+FAISS_INDEX_TYPE = "flat"      # "flat" (exact), "ivf", "hnsw", compressed "sq8" / "fp16" / "pq" / "ivf_sq8" / "ivf_pq",
+                               # or a faiss.index_factory string ("{nlist}" is filled in)
+FAISS_IVF_NLIST = 1024         # IVF lists; capped at (training vectors / 39) for small corpora
+FAISS_TRAIN_SIZE = 100_000     # vectors buffered to train IVF / quantizers before adding
+FAISS_HNSW_M = 32              # HNSW graph degree
+FAISS_HNSW_EF_CONSTRUCTION = 200
+FAISS_NPROBE = 16              # IVF lists scanned per query (search time)
+FAISS_EF_SEARCH = 64           # HNSW candidate list size per query (search time)
+FAISS_PQ_M = 48                # PQ sub-quantizers (bytes per vector); must divide VECTOR_DIM
+FAISS_RERANK = True            # re-rank compressed-index shortlists with the exact vectors (vectors.npy, mmap)
+FAISS_RERANK_FACTOR = 4        # shortlist size = top_k * factor
+FAISS_SERVE_MMAP = True        # query processes map the index read-only, so workers share page-cache pages
+INDEX_SNAPSHOTS_KEEP = 3       # published index snapshots kept on disk (older ones are deleted)
+INDEX_RELOAD_INTERVAL_S = 5.0  # how often query processes check for a newer snapshot (0 disables hot reload)
+FAISS_NUM_SHARDS = 1           # >1 splits the index into independently rebuilt shards searched in parallel
+FAISS_SHARD_BY = "doc"         # "doc" (hash of doc_id; shards rebuildable alone) or "batch" (round-robin ingestion batches)
+FAISS_SEARCH_THREADS = os.cpu_count() or 1   # shard fan-out threads per query process
+FAISS_FILTER_EXACT_MAX = 4096  # filtered searches matching at most this many chunks are scored exactly
+FAISS_FILTER_OVERFETCH_MAX = 16  # IVF: filters matching >= 2/this of the chunks over-fetch instead of hashing ids
 # -----------------------------
 # OCR / PDF Config
 # -----------------------------
 OCR_CHUNKS_FOLDER = "/Users/dev/Downloads/ADEO AI Assessment/HybridLLM_Knowledge_Agent/ocr_chunks"
 SUPPORTED_EXTENSIONS = [".pdf"]
+OCR_DPI = 300                              # render resolution for OCR
+OCR_LANG = "eng"                           # tesseract language(s), e.g. "eng+deu"
+OCR_ADAPTIVE_DPI = False                   # OCR at OCR_LOW_DPI first, re-OCR low-confidence pages at OCR_DPI
+OCR_LOW_DPI = 150                          # first-pass resolution in adaptive mode
+OCR_CONFIDENCE_THRESHOLD = 75.0            # mean tesseract word confidence (0-100) below which a page is re-OCR'd
+OCR_BACKEND = "pytesseract"                # "pytesseract" (CLI per page) | "tesserocr" (engine reused per worker; pip install tesserocr)
+OCR_WORKERS = os.cpu_count() or 1          # worker processes for page-level OCR (1 = serial)
+OCR_MAX_RASTER_MB = 1024                   # ceiling for rendered page images held in memory at once
+OCR_CONCURRENT_DOCS = 4                    # documents OCR'd concurrently by ocr_multiple_pdfs
+TEXT_LAYER_ENABLED = True                  # use a page's embedded text instead of OCR when usable
+TEXT_LAYER_MIN_CHARS = 50                  # min non-whitespace chars for a text layer to count as usable
+TEXT_LAYER_MIN_ALNUM_RATIO = 0.6           # min share of alphanumerics (filters glyph/CID garbage)
+OCR_OUTPUT_FORMAT = "txt"                  # "txt" (one file per page) | "packed" (one .ocrpack per document)
+OCR_CACHE_ENABLED = True                   # reuse OCR text for unchanged PDFs/pages
+OCR_CACHE_PATH = os.path.join(os.path.dirname(OCR_CHUNKS_FOLDER), "ocr_cache.sqlite")
+OCR_CACHE_MAX_MB = 512                     # LRU-evict cached pages beyond this size
 
 # -----------------------------
 # Chunking Options
@@ -27,13 +71,34 @@ SUPPORTED_EXTENSIONS = [".pdf"]
 CHUNKING_METHODS = [
     "sentence",      # sentence-wise chunking
     "paragraph",     # paragraph-wise chunking
-    "fixed_length"   # fixed-length character chunks
+    "fixed_length",  # fixed-length character chunks
+    "token_window",  # sentence-snapped sliding windows sized in embedding-model tokens
+    "semantic"       # cut where adjacent-sentence embedding similarity drops
 ]
+EMBEDDING_MAX_TOKENS = 256   # all-MiniLM-L6-v2 truncates input beyond this (incl. [CLS]/[SEP])
+TOKEN_WINDOW_SIZE = 200      # target tokens per token_window chunk
+TOKEN_WINDOW_OVERLAP = 40    # tokens repeated between consecutive windows (whole sentences)
+SEMANTIC_BREAKPOINT_PERCENTILE = 25   # cut at adjacent-sentence similarities below this percentile of the document
+SEMANTIC_MIN_CHARS = 200     # don't cut a semantic chunk before it reaches this size
+SEMANTIC_MAX_CHARS = 1000    # always cut before exceeding this size (~256 MiniLM tokens)
+SEMANTIC_ENCODE_BATCH_SIZE = 256   # sentences per encoder batch
+CHUNKING_WORKERS = os.cpu_count() or 1   # processes used by chunk_all_pdfs (1 = serial)
+INGEST_BATCH_SIZE = 1024                 # chunks per batch when streaming into FAISS / Neo4j
+
+# -----------------------------
+# Deduplication
+# -----------------------------
+DEDUP_ENABLED = True         # collapse repeated boilerplate chunks before embedding
+DEDUP_THRESHOLD = 0.8        # estimated Jaccard (word 3-grams) at which chunks count as near-duplicates
+DEDUP_NUM_PERM = 64          # MinHash permutations
+DEDUP_BANDS = 16             # LSH bands (DEDUP_NUM_PERM / DEDUP_BANDS rows per band)
 
 # -----------------------------
 # General Settings
 # -----------------------------
 LOGGING_ENABLED = True
+STARTUP_IMPORT_BUDGET_S = 1.0   # max cold import time per entry point (benchmark.py startup)
+STARTUP_ENTRY_POINTS = ["main", "llm_query_and_guardrail", "embeddings", "graph", "entities", "ocr", "chunking"]
 
 # LLM Configs 
 GROK_API_KEY="GROQ_API_KEY"
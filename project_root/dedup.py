@@ -0,0 +1,115 @@
+# dedup.py
+import re
+import zlib
+import hashlib
+import numpy as np
+from config import DEDUP_THRESHOLD, DEDUP_NUM_PERM, DEDUP_BANDS
+
+# -----------------------------
+# Normalization & Shingling
+# -----------------------------
+_NON_WORD = re.compile(r"[^\w]+")
+_MERSENNE_PRIME = np.uint64(4294967311)  # smallest prime above 2**32
+
+def normalize_text(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so OCR noise doesn't hide duplicates."""
+    return " ".join(_NON_WORD.sub(" ", text.lower()).split())
+
+def shingle_hashes(normalized: str, k: int = 3) -> np.ndarray:
+    """CRC32 hashes of the text's word k-grams (the whole text if it is shorter than k words)."""
+    words = normalized.split()
+    if len(words) <= k:
+        shingles = {normalized}
+    else:
+        shingles = {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+# -----------------------------
+# MinHash / LSH Deduplication
+# -----------------------------
+class ChunkDeduplicator:
+    """
+    Collapse exact and near-duplicate chunks between chunking and embedding.
+    Exact duplicates (same normalized text) are caught by hash; near duplicates
+    by MinHash signatures bucketed with LSH, confirmed when the estimated
+    Jaccard similarity is at least `threshold`.
+    Only the first occurrence is passed on; every later occurrence is recorded
+    in `provenance`, keyed by the row of its canonical chunk among the yielded ones.
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, num_perm: int = DEDUP_NUM_PERM,
+                 bands: int = DEDUP_BANDS, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.default_rng(seed)
+        # a < 2**31 keeps a * hash + b inside uint64
+        self._a = rng.integers(1, 2**31, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 2**32, size=num_perm, dtype=np.uint64)
+        self._exact = {}
+        self._buckets = {}
+        self._signatures = []
+        self.provenance = {}
+        self.seen = 0
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+
+    def signature(self, normalized: str) -> np.ndarray:
+        """MinHash signature: per permutation, the minimum permuted shingle hash (vectorized)."""
+        hashes = shingle_hashes(normalized)
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _MERSENNE_PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def find_duplicate(self, text: str):
+        """Return the row of an already kept chunk that `text` duplicates, else register it and return None."""
+        normalized = normalize_text(text)
+        digest = hashlib.sha1(normalized.encode("utf-8")).digest()
+        if digest in self._exact:
+            self.exact_duplicates += 1
+            return self._exact[digest]
+
+        signature = self.signature(normalized)
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates.update(self._buckets.get(key, ()))
+        for row in sorted(candidates):
+            if np.mean(self._signatures[row] == signature) >= self.threshold:
+                self.near_duplicates += 1
+                return row
+
+        row = len(self._signatures)
+        self._exact[digest] = row
+        self._signatures.append(signature)
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, []).append(row)
+        return None
+
+    def filter(self, chunks):
+        """Yield only canonical chunks; duplicates are recorded against their canonical row."""
+        for chunk in chunks:
+            self.seen += 1
+            row = self.find_duplicate(chunk["text"])
+            if row is None:
+                yield chunk
+            else:
+                self.provenance.setdefault(row, []).append({
+                    "doc_id": chunk["doc_id"],
+                    "chunk_id": chunk["chunk_id"],
+                    "page_number": chunk["page_number"]
+                })
+
+    def stats(self) -> dict:
+        removed = self.exact_duplicates + self.near_duplicates
+        return {
+            "chunks_seen": self.seen,
+            "chunks_kept": self.seen - removed,
+            "exact_duplicates": self.exact_duplicates,
+            "near_duplicates": self.near_duplicates,
+            "reduction": removed / self.seen if self.seen else 0.0
+        }
@@ -0,0 +1,212 @@
+# embedding_cache.py
+import os
+import re
+import fcntl
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+import numpy as np
+from config import (
+    EMBEDDING_MODEL_NAME,
+    VECTOR_DIM,
+    EMBEDDING_CACHE_DIR,
+    EMBEDDING_CACHE_KEEP_GENERATIONS
+)
+
+# -----------------------------
+# Persistent Embedding Cache
+# -----------------------------
+class EmbeddingCache:
+    """
+    Disk-backed embeddings keyed by (model name, hash of whitespace-normalized text).
+    Per model directory:
+      vectors.f32   - float32 rows appended back to back, memory-mapped for reads
+      index.sqlite  - key -> row, plus the generation (build) that last used it
+    Each full build starts a new generation; gc() drops entries not used in the
+    last keep_generations builds and compacts the vector file.
+    Several processes may share a cache: writers take an exclusive flock on
+    <dir>/lock and number new rows from the vector file's actual length, readers
+    take a shared one, and a forked child reopens its own connection and lock.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_DIR, model_name: str = EMBEDDING_MODEL_NAME,
+                 dim: int = VECTOR_DIM):
+        self.model_name = model_name
+        self.dim = dim
+        self.dir = Path(path) / re.sub(r"[^\w.-]+", "_", model_name)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.dir / "vectors.f32"
+        self.vectors_path.touch()
+        self.hits = 0
+        self.misses = 0
+        self._open()
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY, row INTEGER NOT NULL, generation INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+            """
+        )
+        self.generation = self._current_generation()
+
+    def _open(self):
+        """Per-process handles: sqlite connection, lock file and vector map."""
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._lock_file = open(self.dir / "lock", "a+")
+        self._map = None
+        self._map_stat = None
+        self._rows = os.path.getsize(self.vectors_path) // (self.dim * 4)
+        self._conn = sqlite3.connect(self.dir / "index.sqlite", check_same_thread=False, timeout=60)
+
+    @contextmanager
+    def _locked(self, exclusive: bool = True):
+        """Thread lock plus an inter-process flock (shared for readers)."""
+        if self._pid != os.getpid():
+            # Forked: the parent's connection and lock description must not be shared
+            self._open()
+        with self._lock:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def key(self, text: str) -> str:
+        normalized = " ".join(text.split())
+        return hashlib.sha1(f"{self.model_name}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def _vectors(self):
+        """
+        Memory map over every row written so far, by any process (caller holds
+        the flock). Remapped when the file grew or was replaced by gc().
+        """
+        stat = os.stat(self.vectors_path)
+        if self._map is None or (stat.st_ino, stat.st_size) != self._map_stat:
+            self._rows = stat.st_size // (self.dim * 4)
+            self._map = (np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self._rows, self.dim))
+                         if self._rows else np.empty((0, self.dim), dtype=np.float32))
+            self._map_stat = (stat.st_ino, stat.st_size)
+        return self._map
+
+    def _current_generation(self) -> int:
+        """
+        The stored generation (caller holds the flock). Re-read on every use, as
+        another process may have begun a build since this one last looked.
+        """
+        row = self._conn.execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()
+        self.generation = int(row[0]) if row else 0
+        return self.generation
+
+    def begin_generation(self) -> int:
+        """Start a new build; entries touched from now on belong to it."""
+        with self._locked():
+            self.generation = self._current_generation() + 1
+            self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('generation', ?)",
+                               (str(self.generation),))
+            self._conn.commit()
+            return self.generation
+
+    def lookup(self, texts: list):
+        """
+        Return (vectors, missing): a float32 (len(texts), dim) matrix with cached
+        rows filled in, and the positions of texts that still need encoding.
+        """
+        keys = [self.key(t) for t in texts]
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        # Exclusive: hits write their generation
+        with self._locked():
+            found = {}
+            unique_keys = list(dict.fromkeys(keys))
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(unique_keys), 500):
+                part = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                found.update(self._conn.execute(
+                    f"SELECT key, row FROM entries WHERE key IN ({placeholders})", part).fetchall())
+            if found:
+                generation = self._current_generation()
+                self._conn.executemany("UPDATE entries SET generation = ? WHERE key = ?",
+                                       [(generation, k) for k in found])
+                self._conn.commit()
+            hit_positions = [i for i, k in enumerate(keys) if k in found]
+            if hit_positions:
+                vectors[hit_positions] = self._vectors()[[found[keys[i]] for i in hit_positions]]
+        missing = [i for i, k in enumerate(keys) if k not in found]
+        self.hits += len(hit_positions)
+        self.misses += len(missing)
+        return vectors, missing
+
+    def store(self, texts: list, vectors: np.ndarray):
+        """Append freshly encoded vectors for texts."""
+        keys = [self.key(t) for t in texts]
+        with self._locked():
+            first = {}
+            for i, k in enumerate(keys):
+                first.setdefault(k, i)
+            positions = list(first.values())
+            generation = self._current_generation()
+            with open(self.vectors_path, "ab") as f:
+                # Rows are numbered from the file's real end, which other processes may have moved
+                start = f.seek(0, os.SEEK_END) // (self.dim * 4)
+                f.write(np.ascontiguousarray(vectors[positions], dtype=np.float32).tobytes())
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, row, generation) VALUES (?, ?, ?)",
+                [(k, start + n, generation) for n, k in enumerate(first)]
+            )
+            self._conn.commit()
+            self._rows = start + len(positions)
+
+    def gc(self, keep_generations: int = EMBEDDING_CACHE_KEEP_GENERATIONS) -> int:
+        """
+        Drop entries unused in the last keep_generations builds and rewrite the
+        vector file with only live rows. Returns the number of entries removed.
+        """
+        with self._locked():
+            oldest = self._current_generation() - keep_generations + 1
+            live = self._conn.execute(
+                "SELECT key, row FROM entries WHERE generation >= ? ORDER BY row", (oldest,)).fetchall()
+            removed = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - len(live)
+            if removed == 0:
+                return 0
+
+            tmp_path = self.vectors_path.with_suffix(".f32.tmp")
+            source = self._vectors()
+            with open(tmp_path, "wb") as f:
+                for start in range(0, len(live), 4096):
+                    rows = [row for _, row in live[start:start + 4096]]
+                    f.write(np.ascontiguousarray(source[rows]).tobytes())
+            del source
+            self._map = None
+            os.replace(tmp_path, self.vectors_path)
+
+            self._conn.execute("DELETE FROM entries WHERE generation < ?", (oldest,))
+            self._conn.executemany("UPDATE entries SET row = ? WHERE key = ?",
+                                   [(n, key) for n, (key, _) in enumerate(live)])
+            self._conn.commit()
+            self._rows = len(live)
+            return removed
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": self._rows,
+            "size_mb": self._rows * self.dim * 4 / (1024 * 1024)
+        }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Return the process-wide embedding cache, opening it on first use (thread-safe)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+    return _cache
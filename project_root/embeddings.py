@@ -1,14 +1,38 @@
 # embeddings.py
 import os
 import json
+import time
+import re
+import shutil
+import threading
+import weakref
 import faiss
+import numpy as np
 from tqdm import tqdm
-from sentence_transformers import SentenceTransformer
 from config import (
     VECTOR_DIM,
     EMBEDDING_MODEL_NAME,
+    EMBEDDING_BATCH_SIZE,
+    INGEST_BATCH_SIZE,
     FAISS_INDEX_PATH,
-    FAISS_METADATA_PATH
+    FAISS_METADATA_PATH,
+    CHUNK_STORE_PATH,
+    DEDUP_ENABLED,
+    EMBEDDING_CACHE_ENABLED,
+    FAISS_INDEX_TYPE,
+    FAISS_IVF_NLIST,
+    FAISS_TRAIN_SIZE,
+    FAISS_HNSW_M,
+    FAISS_HNSW_EF_CONSTRUCTION,
+    FAISS_NPROBE,
+    FAISS_EF_SEARCH,
+    FAISS_PQ_M,
+    FAISS_RERANK,
+    FAISS_RERANK_FACTOR,
+    INDEX_SNAPSHOTS_KEEP,
+    FAISS_NUM_SHARDS,
+    FAISS_FILTER_EXACT_MAX,
+    FAISS_FILTER_OVERFETCH_MAX
 )
 # from config import (
 #     VECTOR_DIM,
@@ -19,86 +43,561 @@ from config import (
 #     FAISS_METADATA_FILE     
 # )
 
-from chunking import chunk_all_pdfs
+from chunking import iter_chunks, iter_batches
+from chunk_store import ChunkStore, ChunkStoreBuilder, chunk_faiss_id
+from dedup import ChunkDeduplicator
+from embedding_cache import get_embedding_cache
 
 # -----------------------------
-# Initialize Model
+# Initialize Model (lazily)
 # -----------------------------
-model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+# Loading the model (and importing torch) takes seconds, so it happens on
+# first use rather than at import; `embeddings.model` still works.
+_model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """Return the shared SentenceTransformer, loading it once on first use (thread-safe)."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                _model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    return _model
+
+def __getattr__(name):
+    if name == "model":
+        return get_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 # faiss.write_index(index, FAISS_INDEX_PATH)
 
+# -----------------------------
+# Embedding Functions
+# -----------------------------
+def encode_texts(texts, model=None, batch_size=EMBEDDING_BATCH_SIZE, cache=None):
+    """
+    Embed a list of texts into a contiguous float32 matrix (one row per text, input order).
+    Texts are encoded in length-sorted batches so each batch pads to similar lengths.
+    With an EmbeddingCache, only texts missing from the cache are encoded (and then stored).
+    """
+    if cache is not None:
+        vectors, missing = cache.lookup(texts)
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            vectors[missing] = encode_texts(missing_texts, model=model, batch_size=batch_size)
+            cache.store(missing_texts, vectors[missing])
+        return vectors
+
+    model = get_model() if model is None else model
+    vectors = np.empty((len(texts), model.get_sentence_embedding_dimension()), dtype=np.float32)
+    order = np.argsort([len(t) for t in texts], kind="stable")
+    for start in range(0, len(texts), batch_size):
+        rows = order[start:start + batch_size]
+        vectors[rows] = model.encode([texts[i] for i in rows], batch_size=batch_size, convert_to_numpy=True)
+    return vectors
+
 # -----------------------------
 # FAISS Functions
 # -----------------------------
-def create_faiss_index(chunks, model=model, vector_dim=VECTOR_DIM):
+# The index and its chunk store are saved together as one versioned snapshot
+# directory, CHUNK_STORE_PATH/snapshots/v000042 (index.faiss next to the
+# metadata columns). A snapshot is written completely and only then published
+# by atomically replacing the CHUNK_STORE_PATH/CURRENT pointer file, so a
+# reader never pairs an index with other metadata and never sees a partial
+# write; readers that already opened a snapshot keep using it undisturbed.
+# The last INDEX_SNAPSHOTS_KEEP snapshots are kept.
+# Vectors are added under stable ids (chunk_store.chunk_faiss_id), so search
+# labels are ids, mapped back to metadata rows with ChunkStore.rows_for_ids.
+INDEX_FILE_NAME = "index.faiss"
+SNAPSHOTS_DIR = "snapshots"
+CURRENT_FILE = "CURRENT"
+_SNAPSHOT_RE = re.compile(r"v\d+")
+
+# -----------------------------
+# Index Types
+# -----------------------------
+# "flat" is exact search. "ivf" scans only the nprobe closest of nlist
+# clusters; "hnsw" walks a proximity graph (no deletes). The compressed types
+# store 1 (sq8), 2 (fp16) or FAISS_PQ_M / dim (pq) bytes per dimension instead
+# of 4; their shortlists are re-ranked exactly from the float32 vectors kept in
+# the chunk store (vectors.npy, memory-mapped). Any other value is used as a
+# faiss.index_factory string. IVF indexes carry ids themselves; everything
+# else is wrapped in IDMap2.
+PQ_NBITS = 8      # bits per PQ sub-quantizer code (FAISS default)
+PQ_MIN_NBITS = 4  # fewest bits worth using before falling back to SQ8
+_INDEX_SPECS = {
+    "flat": "IDMap2,Flat",
+    "ivf": "IVF{nlist},Flat",
+    "hnsw": f"IDMap2,HNSW{FAISS_HNSW_M}",
+    "sq8": "IDMap2,SQ8",
+    "fp16": "IDMap2,SQfp16",
+    "pq": f"IDMap2,PQ{FAISS_PQ_M}",
+    "ivf_sq8": "IVF{nlist},SQ8",
+    "ivf_pq": f"IVF{{nlist}},PQ{FAISS_PQ_M}"
+}
+
+def index_factory_string(index_type=FAISS_INDEX_TYPE, n_train=None) -> str:
     """
-    Create a FAISS index from a list of chunk dictionaries.
-    Each chunk must contain 'text', 'doc_id', 'chunk_id', 'page_number'.
-    Returns the FAISS index and metadata list.
+    FAISS factory string for an index type. When only n_train vectors are
+    available, nlist is scaled down and so are the PQ codebooks (k-means needs
+    at least 2^nbits points); below 2^PQ_MIN_NBITS points PQ falls back to SQ8.
     """
-    index = faiss.IndexFlatL2(vector_dim)
-    metadata = []
+    nlist = FAISS_IVF_NLIST if n_train is None else max(1, min(FAISS_IVF_NLIST, n_train // 39))
+    spec = _INDEX_SPECS.get(index_type, index_type).format(nlist=nlist)
+    if n_train is not None and n_train < 2 ** PQ_NBITS:
+        nbits = max(n_train, 1).bit_length() - 1
+        spec = re.sub(r"PQ(\d+)(?!\d|x)", lambda m: f"PQ{m.group(1)}x{nbits}" if nbits >= PQ_MIN_NBITS else "SQ8", spec)
+    return spec if spec.startswith(("IVF", "IDMap")) else f"IDMap2,{spec}"
 
-    for chunk in tqdm(chunks, desc="Creating embeddings"):
-        embedding = model.encode(chunk["text"]).reshape(1, -1)
-        index.add(embedding)
-        metadata.append(chunk)
+def is_compressed(index_type=FAISS_INDEX_TYPE) -> bool:
+    """Whether the index type stores lossy codes (scalar / product quantization) rather than float32 vectors."""
+    spec = index_factory_string(index_type)
+    return "SQ" in spec or "PQ" in spec
 
-    return index, metadata
+def _ivf(index):
+    try:
+        return faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return None
 
-def save_faiss_index(index, metadata, index_file=FAISS_INDEX_PATH, metadata_file=FAISS_METADATA_PATH):
+def _hnsw(index):
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    return getattr(inner, "hnsw", None)
+
+def new_faiss_index(vector_dim=VECTOR_DIM, index_type=FAISS_INDEX_TYPE, training_vectors=None):
     """
-    Save FAISS index and metadata to disk.
+    An empty index of the given type that accepts add_with_ids.
+    Types that need training (IVF, quantizers) are trained on training_vectors
+    when given; otherwise the caller must train before adding.
     """
-    faiss.write_index(index, index_file)
-    with open(metadata_file, "w", encoding="utf-8") as f:
-        json.dump(metadata, f, indent=2)
-    print(f"FAISS index saved to {index_file}")
-    print(f"Metadata saved to {metadata_file}")
+    n_train = None if training_vectors is None else len(training_vectors)
+    index = faiss.index_factory(vector_dim, index_factory_string(index_type, n_train))
+    hnsw = _hnsw(index)
+    if hnsw is not None:
+        hnsw.efConstruction = FAISS_HNSW_EF_CONSTRUCTION
+    if not index.is_trained and training_vectors is not None:
+        started = time.perf_counter()
+        index.train(np.ascontiguousarray(training_vectors, dtype=np.float32))
+        print(f"Trained {index_type} index on {n_train} vectors in {time.perf_counter() - started:.1f}s")
+    return index
 
-def load_faiss_index(index_file=FAISS_INDEX_PATH, metadata_file=FAISS_METADATA_PATH):
+def search_parameters(index, top_k=5, nprobe=None, ef_search=None, selector=None):
     """
-    Load FAISS index and metadata from disk.
-    Returns index and metadata list.
+    Per-query FAISS search parameters for IVF (nprobe) or HNSW (efSearch)
+    indexes, restricted to `selector` (see id_selector) if given; else None.
     """
-    if not os.path.exists(index_file) or not os.path.exists(metadata_file):
-        raise FileNotFoundError("FAISS index or metadata file not found.")
+    if _ivf(index) is not None:
+        params = faiss.SearchParametersIVF(nprobe=nprobe or FAISS_NPROBE)
+    elif _hnsw(index) is not None:
+        params = faiss.SearchParametersHNSW(efSearch=max(ef_search or FAISS_EF_SEARCH, top_k))
+    elif selector is not None:
+        params = faiss.SearchParameters()
+    else:
+        return None
+    if selector is not None:
+        params.sel = selector
+    return params
+
+def with_ids(index, ids):
+    """Copy a legacy row-labelled flat index into an id-mapped one (row i -> ids[i])."""
+    if not isinstance(index, faiss.IndexFlat):
+        return index
+    id_mapped = new_faiss_index(index.d, "flat")
+    if index.ntotal:
+        id_mapped.add_with_ids(index.reconstruct_n(0, index.ntotal), np.ascontiguousarray(ids, dtype=np.int64))
+    return id_mapped
+
+# ChunkStore -> (index, ntotal, row of each index position), for id-mapped indexes
+_position_rows = weakref.WeakKeyDictionary()
+
+def position_rows(index, metadata):
+    """Metadata row of each position of an id-mapped index (-1 if unknown); cached per metadata."""
+    cached = _position_rows.get(metadata)
+    if cached is None or cached[0] is not index or cached[1] != index.ntotal:
+        rows = metadata.rows_for_ids(faiss.vector_to_array(index.id_map))
+        cached = _position_rows[metadata] = (index, index.ntotal, rows)
+    return cached[2]
+
+def id_selector(index, metadata, mask):
+    """
+    Compile a boolean row mask (ChunkStore.select) into a FAISS IDSelector,
+    so non-matching vectors are skipped inside index.search.
+    Id-mapped indexes (flat, HNSW, SQ/PQ) get a bitmap over the positions of
+    the wrapped index, which is then searched directly. IVF indexes store the
+    ids themselves, so the smaller side is hashed: the matching ids, or the
+    excluded ids wrapped in IDSelectorNot.
+    Returns (selector, rows): rows maps positions to metadata rows for a
+    bitmap selector, and is None for an id selector.
+    """
+    if isinstance(index, faiss.IndexIDMap):
+        rows = position_rows(index, metadata)
+        bitmap = np.packbits(np.where(rows >= 0, mask[rows], False), bitorder="little")
+        selector = faiss.IDSelectorBitmap(len(rows), faiss.swig_ptr(bitmap))
+        selector.referenced_objects = [bitmap]  # the selector only points at the bits
+        return selector, rows
+    ids = np.asarray(metadata.ids)
+    if mask.sum() <= len(mask) // 2:
+        return faiss.IDSelectorBatch(np.ascontiguousarray(ids[mask], dtype=np.int64)), None
+    excluded = faiss.IDSelectorBatch(np.ascontiguousarray(ids[~mask], dtype=np.int64))
+    selector = faiss.IDSelectorNot(excluded)
+    selector.referenced_objects = [excluded]  # IDSelectorNot doesn't own the selector it wraps
+    return selector, None
+
+def search_rows_exact(query_embeddings, index, metadata, rows, top_k=5):
+    """
+    Exact search over just `rows`: their vectors (stored, or reconstructed from
+    an id-mapped index) are scored by brute force. Returns (distances, rows)
+    matrices like index.search, padded with -1.
+    """
+    if metadata.vectors is not None:
+        vectors = np.asarray(metadata.vectors[rows], dtype=np.float32)
+    else:
+        vectors = index.reconstruct_batch(np.ascontiguousarray(np.asarray(metadata.ids)[rows], dtype=np.int64))
+    distances, positions = faiss.knn(np.ascontiguousarray(query_embeddings, dtype=np.float32), vectors, top_k)
+    return distances, np.where(positions >= 0, rows[positions], -1)
+
+class FaissIndexBuilder:
+    """
+    Accumulates embedded chunks into a FAISS index + ChunkStore.
+    Types that need training hold back the first train_size vectors, train
+    on them, then add. For compressed types the float32 vectors are also kept
+    in the metadata (saved as vectors.npy) for exact re-ranking.
+    """
+
+    def __init__(self, vector_dim=VECTOR_DIM, index_type=FAISS_INDEX_TYPE, train_size=FAISS_TRAIN_SIZE):
+        self.vector_dim = vector_dim
+        self.index_type = index_type
+        self.train_size = train_size
+        self.index = new_faiss_index(vector_dim, index_type)
+        self.keep_vectors = is_compressed(index_type)
+        self.pending = []  # (vectors, ids) held back until the index is trained
+        self.metadata = ChunkStoreBuilder()
+
+    def __len__(self):
+        return len(self.metadata)
+
+    def add(self, chunks, vectors):
+        """Add chunk dicts with their embeddings (one row per chunk)."""
+        ids = np.array([chunk_faiss_id(c["chunk_id"]) for c in chunks], dtype=np.int64)
+        if self.index.is_trained:
+            self.index.add_with_ids(vectors, ids)
+        else:
+            self.pending.append((vectors, ids))
+            if sum(len(v) for v, _ in self.pending) >= self.train_size:
+                self._train_and_flush()
+        for chunk in chunks:
+            self.metadata.append(chunk)
+        if self.keep_vectors:
+            self.metadata.append_vectors(vectors)
+
+    def _train_and_flush(self):
+        self.index = new_faiss_index(self.vector_dim, self.index_type,
+                                     np.concatenate([v for v, _ in self.pending]))
+        for vectors, ids in self.pending:
+            self.index.add_with_ids(vectors, ids)
+        self.pending.clear()
 
-    index = faiss.read_index(index_file)
-    with open(metadata_file, "r", encoding="utf-8") as f:
-        metadata = json.load(f)
+    def build(self):
+        """Returns (index, ChunkStore)."""
+        if self.pending:
+            self._train_and_flush()
+        return self.index, self.metadata.build()
 
-    print(f"FAISS index loaded from {index_file}")
-    print(f"Metadata loaded from {metadata_file}")
+def create_faiss_index(chunks, model=None, vector_dim=VECTOR_DIM, batch_size=INGEST_BATCH_SIZE, cache=None,
+                       index_type=FAISS_INDEX_TYPE, train_size=FAISS_TRAIN_SIZE):
+    """
+    Create a FAISS index from chunk dictionaries (a list or any iterable,
+    e.g. chunking.iter_chunks(), which is consumed lazily).
+    Chunks are embedded and added batch_size at a time, one matrix per batch.
+    With an EmbeddingCache, unchanged chunk texts reuse their stored vectors.
+    index_type selects the index (see index_factory_string; training and
+    re-rank vectors are handled by FaissIndexBuilder).
+    Each chunk must contain 'text', 'doc_id', 'chunk_id', 'page_number'.
+    Returns the id-mapped FAISS index and its metadata as a ChunkStore, where
+    metadata[i] is the chunk dict for the vector with id metadata.ids[i].
+    """
+    builder = FaissIndexBuilder(vector_dim, index_type, train_size)
+    started = time.perf_counter()
+
+    with tqdm(desc="Creating embeddings", unit="chunk") as progress:
+        for batch in iter_batches(chunks, batch_size):
+            builder.add(batch, encode_texts([chunk["text"] for chunk in batch], model=model, cache=cache))
+            progress.update(len(batch))
+
+    elapsed = time.perf_counter() - started
+    print(f"Embedded {len(builder)} chunks in {elapsed:.1f}s "
+          f"({len(builder) / elapsed if elapsed > 0 else 0.0:.1f} chunks/sec)")
+    if cache is not None:
+        print(f"Embedding cache: {cache.stats()}")
+    return builder.build()
+
+def current_snapshot(path=CHUNK_STORE_PATH):
+    """Name of the published snapshot under path (e.g. "v000042"), or None if none is published."""
+    try:
+        with open(os.path.join(path, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def _list_snapshots(path) -> list:
+    root = os.path.join(path, SNAPSHOTS_DIR)
+    if not os.path.isdir(root):
+        return []
+    return sorted(name for name in os.listdir(root) if _SNAPSHOT_RE.fullmatch(name))
+
+def _new_snapshot_dir(path) -> str:
+    """Claim the next snapshot version (mkdir is atomic, so concurrent writers never share one)."""
+    os.makedirs(os.path.join(path, SNAPSHOTS_DIR), exist_ok=True)
+    while True:
+        latest = _list_snapshots(path)
+        name = f"v{int(latest[-1][1:]) + 1 if latest else 1:06d}"
+        try:
+            os.mkdir(os.path.join(path, SNAPSHOTS_DIR, name))
+            return name
+        except FileExistsError:
+            continue
+
+def _fsync_files(directory):
+    for name in os.listdir(directory):
+        with open(os.path.join(directory, name), "rb") as f:
+            os.fsync(f.fileno())
+
+def _prune_snapshots(path, keep=INDEX_SNAPSHOTS_KEEP):
+    """Delete all but the newest `keep` snapshots (never the published one)."""
+    current = current_snapshot(path)
+    for name in _list_snapshots(path)[:-keep]:
+        if name != current:
+            shutil.rmtree(os.path.join(path, SNAPSHOTS_DIR, name), ignore_errors=True)
+
+def save_faiss_index(index, metadata, path=CHUNK_STORE_PATH):
+    """
+    Save FAISS index and metadata to disk as a new snapshot and publish it.
+    metadata (a ChunkStore or a list of chunk dicts) is written as a compact
+    chunk store directory (see chunk_store.py) with the index beside it.
+    Returns the snapshot name.
+    """
+    if not isinstance(metadata, ChunkStore):
+        metadata = ChunkStore.from_chunks(metadata)
+    name = _new_snapshot_dir(path)
+    snapshot_dir = os.path.join(path, SNAPSHOTS_DIR, name)
+    metadata.save(snapshot_dir)
+    faiss.write_index(index, os.path.join(snapshot_dir, INDEX_FILE_NAME))
+    _fsync_files(snapshot_dir)
+
+    # Publish: atomically repoint CURRENT at the complete snapshot
+    tmp_pointer = os.path.join(path, f"{CURRENT_FILE}.tmp-{os.getpid()}")
+    with open(tmp_pointer, "w", encoding="utf-8") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_pointer, os.path.join(path, CURRENT_FILE))
+    _prune_snapshots(path)
+    print(f"FAISS index and metadata saved to {path} (snapshot {name})")
+    return name
+
+def load_faiss_index(path=CHUNK_STORE_PATH, legacy_index_file=FAISS_INDEX_PATH,
+                     legacy_metadata_file=FAISS_METADATA_PATH, mmap=False, snapshot=None):
+    """
+    Load FAISS index and metadata from disk: the given snapshot, else the published one.
+    Returns index and metadata (a memory-mapped ChunkStore; metadata[i] is a chunk dict).
+    With mmap the index is opened read-only and memory-mapped too (for serving):
+    its vectors / codes stay in the page cache, shared by every process that
+    maps the same files, instead of being copied into each process. Such an
+    index cannot be modified.
+    Falls back to the legacy faiss_index.idx (+ faiss_metadata.json if no chunk
+    store exists yet), relabelling its rows with stable chunk ids.
+    """
+    store_dir = path
+    snapshot = snapshot or current_snapshot(path)
+    if snapshot is not None:
+        store_dir = os.path.join(path, SNAPSHOTS_DIR, snapshot)
+    index_file = os.path.join(store_dir, INDEX_FILE_NAME)
+    if os.path.exists(index_file):
+        if mmap:
+            # IO_FLAG_MMAP_IFC maps flat / IVF / SQ / HNSW storage; older FAISS only maps IVF lists
+            flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+            index = faiss.read_index(index_file, flags)
+        else:
+            index = faiss.read_index(index_file)
+        metadata = ChunkStore.load(store_dir)
+        print(f"FAISS index and metadata loaded from {store_dir}{' (memory-mapped)' if mmap else ''}")
+        return index, metadata
+
+    # Layouts from before snapshots: a bare chunk store, or faiss_metadata.json
+    has_store = os.path.exists(os.path.join(path, "meta.json"))
+    if not os.path.exists(legacy_index_file) or not (has_store or os.path.exists(legacy_metadata_file)):
+        raise FileNotFoundError("FAISS index or metadata file not found.")
+    if has_store:
+        metadata = ChunkStore.load(path)
+    else:
+        with open(legacy_metadata_file, "r", encoding="utf-8") as f:
+            metadata = ChunkStore.from_chunks(json.load(f))
+    index = with_ids(faiss.read_index(legacy_index_file), metadata.ids)
+    print(f"FAISS index loaded from {legacy_index_file} (legacy layout)")
     return index, metadata
 
-def search_faiss(query, index, metadata, top_k=5, model=model):
+def rerank_exact(query_vector, rows, vectors, top_k):
+    """
+    Re-score candidate rows by exact L2 distance to their full-precision vectors.
+    Returns (rows, distances) of the best top_k; negative (missing) rows are dropped.
+    """
+    rows = np.asarray(rows)
+    rows = np.sort(rows[rows >= 0])  # ascending rows read the memory map sequentially
+    candidates = np.asarray(vectors[rows], dtype=np.float32)
+    distances = ((candidates - np.asarray(query_vector, dtype=np.float32)) ** 2).sum(axis=1)
+    best = np.argsort(distances, kind="stable")[:top_k]
+    return rows[best], distances[best]
+
+def search_faiss(query, index, metadata, top_k=5, model=None, nprobe=None, ef_search=None, rerank=FAISS_RERANK,
+                 chunk_filter=None):
     """
     Search FAISS index for similar chunks.
+    nprobe (IVF) and ef_search (HNSW) trade recall for latency per query;
+    they default to FAISS_NPROBE / FAISS_EF_SEARCH and are ignored by flat indexes.
+    With rerank and stored vectors (compressed indexes), top_k * FAISS_RERANK_FACTOR
+    candidates are fetched and re-ranked by exact distance.
+    chunk_filter (a chunk_store.ChunkFilter) restricts the search to matching
+    chunks inside the search itself (see search_vectors).
     Returns top_k matching chunk dictionaries.
     """
-    query_embedding = model.encode(query).reshape(1, -1)
-    distances, indices = index.search(query_embedding, top_k)
+    return search_faiss_batch([query], index, metadata, top_k, model=model, nprobe=nprobe,
+                              ef_search=ef_search, rerank=rerank, chunk_filter=chunk_filter)[0]
+
+def search_faiss_batch(queries, index, metadata, top_k=5, model=None, nprobe=None, ef_search=None,
+                       rerank=FAISS_RERANK, chunk_filter=None):
+    """
+    Search FAISS for many queries at once: one batched encode and one
+    multi-row index.search instead of a Python loop of single queries.
+    Returns one result list per query, each shaped like search_faiss's.
+    """
+    if not len(queries):
+        return []
+    query_embeddings = encode_texts(list(queries), model=model)
+    return search_vectors(query_embeddings, index, metadata, top_k, nprobe, ef_search, rerank, chunk_filter)
+
+def search_vectors(query_embeddings, index, metadata, top_k=5, nprobe=None, ef_search=None, rerank=FAISS_RERANK,
+                   chunk_filter=None):
+    """
+    search_faiss_batch for already encoded queries (a float32 matrix, one row per query).
+    A chunk_filter is applied inside the search: matching rows are found on the
+    metadata columns, then
+      - at most FAISS_FILTER_EXACT_MAX of them: scored exactly, by brute force
+        over just those vectors (IVF: all lists are probed, skipping the rest)
+      - more: searched with an IDSelector (see id_selector), except that IVF
+        indexes, whose selector would hash every matching id, over-fetch by up
+        to FAISS_FILTER_OVERFETCH_MAX and drop non-matching rows
+    so a filtered query costs no more than the unfiltered one.
+    """
+    selector = rows = post_filter = None
+    if chunk_filter is not None:
+        mask = metadata.select(chunk_filter)
+        matching = np.flatnonzero(mask)
+        if not len(matching):
+            return [[] for _ in query_embeddings]
+        narrow = len(matching) <= FAISS_FILTER_EXACT_MAX
+        if narrow and (metadata.vectors is not None or isinstance(index, faiss.IndexIDMap2)):
+            distances, all_rows = search_rows_exact(query_embeddings, index, metadata, matching,
+                                                    min(top_k, len(matching)))
+            return _hits(metadata, all_rows, distances)
+        if len(matching) < len(mask):
+            if (isinstance(index, faiss.IndexIDMap) or narrow
+                    or len(matching) * FAISS_FILTER_OVERFETCH_MAX < 2 * len(mask)):
+                selector, rows = id_selector(index, metadata, mask)
+            else:
+                post_filter = mask
+        if narrow and _ivf(index) is not None:
+            nprobe = _ivf(index).nlist
+        top_k = min(top_k, len(matching))
 
-    results = []
-    for idx, dist in zip(indices[0], distances[0]):
-        if idx < len(metadata):
-            results.append({
-                "chunk": metadata[idx],
-                "score": float(dist)
-            })
-    return results
+    rerank = rerank and metadata.vectors is not None
+    fetch_k = top_k * FAISS_RERANK_FACTOR if rerank else top_k
+    if post_filter is None:
+        distances, all_rows = _search_index(query_embeddings, index, metadata, fetch_k, nprobe, ef_search,
+                                            selector, rows)
+    else:
+        # Twice the expected number of candidates to see fetch_k matching ones
+        search_k = -(-2 * fetch_k * len(post_filter) // len(matching))
+        distances, all_rows = _search_index(query_embeddings, index, metadata, search_k, nprobe, ef_search)
+        keep = (all_rows >= 0) & post_filter[all_rows]
+        all_rows = [r[k][:fetch_k] for r, k in zip(all_rows, keep)]
+        distances = [d[k][:fetch_k] for d, k in zip(distances, keep)]
+        short = [q for q, r in enumerate(all_rows) if len(r) < min(fetch_k, len(matching))]
+        if short:
+            # Too few matches among the candidates: search those queries with a selector after all
+            selector, rows = id_selector(index, metadata, post_filter)
+            retry_distances, retry_rows = _search_index(query_embeddings[short], index, metadata, fetch_k, nprobe,
+                                                        ef_search, selector, rows)
+            for q, dists, found in zip(short, retry_distances, retry_rows):
+                distances[q], all_rows[q] = dists, found
+
+    if rerank:
+        reranked = [rerank_exact(query_embedding, candidates, metadata.vectors, top_k)
+                    for query_embedding, candidates in zip(query_embeddings, all_rows)]
+        all_rows, distances = [r for r, _ in reranked], [d for _, d in reranked]
+    return _hits(metadata, all_rows, distances)
+
+def _search_index(query_embeddings, index, metadata, k, nprobe=None, ef_search=None, selector=None, rows=None):
+    """index.search mapped to metadata rows: (distances, rows), -1 where there is no result."""
+    params = search_parameters(index, k, nprobe, ef_search, selector)
+    if rows is None:
+        distances, labels = index.search(query_embeddings, k, params=params)
+        # FAISS pads missing results with -1, which maps to no row
+        return distances, metadata.rows_for_ids(labels)
+    # Bitmap over the wrapped index's positions: search it directly
+    distances, positions = index.index.search(query_embeddings, k, params=params)
+    return distances, np.where(positions >= 0, rows[positions], -1)
+
+def _hits(metadata, all_rows, distances):
+    """Per query, [{"chunk", "score"}] for the rows found (skipping -1 padding)."""
+    return [
+        [{"chunk": metadata[row], "score": float(dist)} for row, dist in zip(rows, dists) if row >= 0]
+        for rows, dists in zip(all_rows, distances)
+    ]
 
 # -----------------------------
 # Wrapper for full ingestion
 # -----------------------------
-def build_faiss_from_ocr():
+def build_faiss_from_ocr(method="sentence", chunk_size=500, dedup=DEDUP_ENABLED, use_cache=EMBEDDING_CACHE_ENABLED,
+                         index_type=FAISS_INDEX_TYPE, num_shards=FAISS_NUM_SHARDS):
     """
-    Build FAISS index from chunks obtained via chunking.py
+    Build FAISS index from chunks streamed from chunking.py
+    Chunks are never materialized as a separate list; only the index and
+    its metadata grow with the corpus.
+    With dedup, exact and near-duplicate chunks (repeated footers, addresses...)
+    are embedded once; their other locations are kept in metadata.provenance.
+    With use_cache, only chunks whose text changed since earlier builds are
+    encoded; cache entries unused by recent builds are garbage-collected.
+    index_type picks exact or approximate search (see index_factory_string).
+    With num_shards > 1 the index is split into shards (see sharded_index.py)
+    and the list of shard indexes is returned with their combined metadata.
     Returns index and metadata.
     """
-    chunks = chunk_all_pdfs()
-    print(f"Loaded {len(chunks)} chunks from chunking module")
-    index, metadata = create_faiss_index(chunks)
-    save_faiss_index(index, metadata)
+    cache = get_embedding_cache() if use_cache else None
+    if cache is not None:
+        cache.begin_generation()
+
+    chunks = iter_chunks(method=method, chunk_size=chunk_size)
+    deduplicator = None
+    if num_shards > 1:
+        from sharded_index import build_sharded_index  # sharded_index imports this module
+        # Deduplicated inside build_sharded_index, which knows the shards
+        shards = build_sharded_index(chunks, num_shards, cache=cache, index_type=index_type, dedup=dedup)
+        index, metadata = [index for index, _ in shards], ChunkStore.concat([store for _, store in shards])
+    else:
+        deduplicator = ChunkDeduplicator() if dedup else None
+        if deduplicator is not None:
+            chunks = deduplicator.filter(chunks)
+        index, metadata = create_faiss_index(chunks, cache=cache, index_type=index_type)
+    print(f"Embedded {len(metadata)} chunks from chunking module")
+    if cache is not None:
+        removed = cache.gc()
+        if removed:
+            print(f"Embedding cache: removed {removed} stale entries")
+    if deduplicator is not None:
+        print(f"Deduplication: {deduplicator.stats()}")
+    if num_shards <= 1:
+        if deduplicator is not None:
+            metadata.provenance = deduplicator.provenance
+        save_faiss_index(index, metadata)
     return index, metadata
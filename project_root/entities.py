@@ -1,17 +1,22 @@
 # entities.py
-import spacy
-from neo4j import GraphDatabase
-from config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+import threading
+from graph import get_driver
 
 # -----------------------------
-# Load NLP Model
+# Load NLP Model (lazily)
 # -----------------------------
-nlp = spacy.load("en_core_web_sm")  # Swap with larger model if needed
-
-# -----------------------------
-# Neo4j Initialization
-# -----------------------------
-driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+_nlp = None
+_nlp_lock = threading.Lock()
+
+def get_nlp():
+    """Return the spaCy pipeline, loading it once on first use (thread-safe)."""
+    global _nlp
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                import spacy
+                _nlp = spacy.load("en_core_web_sm")  # Swap with larger model if needed
+    return _nlp
 
 # -----------------------------
 # Entity Extraction Functions
@@ -21,7 +26,7 @@ def extract_entities(text):
     Extract named entities from text using SpaCy.
     Returns a list of dicts: [{"text": entity_text, "label": entity_label}, ...]
     """
-    doc = nlp(text)
+    doc = get_nlp()(text)
     return [{"text": ent.text, "label": ent.label_} for ent in doc.ents]
 
 def create_entity_node(tx, entity_text, entity_label):
@@ -54,7 +59,7 @@ def enrich_graph_with_entities(chunks=None):
     Extract entities from chunks and populate the Neo4j graph.
     If chunks is None, fetch all chunks from Neo4j.
     """
-    with driver.session() as session:
+    with get_driver().session() as session:
         # If chunks not provided, fetch all chunks from Neo4j
         if chunks is None:
             chunks = []
@@ -1,12 +1,23 @@
 # graph.py
-from neo4j import GraphDatabase
-from config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
-from chunking import chunk_all_pdfs
+import threading
+from config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, INGEST_BATCH_SIZE
+from chunking import iter_chunks, iter_batches
 
 # -----------------------------
-# Neo4j Initialization
+# Neo4j Initialization (lazily)
 # -----------------------------
-driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+_driver = None
+_driver_lock = threading.Lock()
+
+def get_driver():
+    """Return the process-wide Neo4j driver, created once on first use (thread-safe)."""
+    global _driver
+    if _driver is None:
+        with _driver_lock:
+            if _driver is None:
+                from neo4j import GraphDatabase
+                _driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    return _driver
 
 # -----------------------------
 # Graph Helper Functions
@@ -42,46 +53,81 @@ def create_chunk_node(tx, chunk):
         doc_id=chunk["doc_id"]
     )
 
+def delete_document_chunks(tx, doc_id):
+    """Delete a document's chunk nodes (and their relationships), keeping the document node."""
+    tx.run(
+        """
+        MATCH (d:Document {doc_id: $doc_id})-[:HAS_CHUNK]->(c:Chunk)
+        DETACH DELETE c
+        """,
+        doc_id=doc_id
+    )
+
+def create_chunk_nodes(tx, chunks):
+    """Create a batch of chunk nodes and link them to their documents in one query."""
+    tx.run(
+        """
+        UNWIND $chunks AS chunk
+        MERGE (c:Chunk {chunk_id: chunk.chunk_id})
+        SET c.text = chunk.text, c.page_number = chunk.page_number
+        WITH c, chunk
+        MATCH (d:Document {doc_id: chunk.doc_id})
+        MERGE (d)-[:HAS_CHUNK]->(c)
+        """,
+        chunks=[
+            {k: chunk[k] for k in ("chunk_id", "text", "page_number", "doc_id")}
+            for chunk in chunks
+        ]
+    )
+
 def get_all_chunks():
     """
-    Fetch all chunks from OCR storage or chunking module.
-    Returns a list of chunks with fields: doc_id, page_number, chunk_id, text.
+    Stream all chunks from OCR storage via the chunking module.
+    Yields chunks with fields: doc_id, page_number, chunk_id, text.
     """
-    # Assuming chunk_all_pdfs returns a list of dicts with proper fields
-    return chunk_all_pdfs(method="default")
+    return iter_chunks()
 
 # -----------------------------
 # Graph Population / Hybrid Ready
 # -----------------------------
-def build_graph(chunks=None, clear_existing=True):
+def build_graph(chunks=None, clear_existing=True, batch_size=INGEST_BATCH_SIZE):
     """
     Populate Neo4j with Documents and Chunks.
     Supports hybrid search by enabling entity linking later.
-    If chunks is None, fetch all chunks using chunking module.
+    chunks may be a list or any iterable (e.g. chunking.iter_chunks()); it is
+    consumed in batches of batch_size, one write transaction per batch.
+    If chunks is None, stream all chunks using chunking module.
     """
     if chunks is None:
         chunks = get_all_chunks()
 
-    total_docs = len(set(c["doc_id"] for c in chunks))
-    total_chunks = len(chunks)
+    doc_ids = set()
+    total_chunks = 0
 
-    with driver.session() as session:
+    with get_driver().session() as session:
         if clear_existing:
             print("Clearing existing Neo4j graph...")
             session.execute_write(clear_neo4j)
 
-        # Create Document nodes
-        doc_ids = set(chunk["doc_id"] for chunk in chunks)
-        for doc_id in doc_ids:
-            session.execute_write(create_document_node, doc_id, doc_id)
-
-        # Create Chunk nodes
-        for idx, chunk in enumerate(chunks, 1):
-            session.execute_write(create_chunk_node, chunk)
-            if idx % 50 == 0:
-                print(f"Created {idx}/{total_chunks} chunks...")
-
-    print(f"Neo4j graph built: {total_docs} documents, {total_chunks} chunks")
+        for batch in iter_batches(chunks, batch_size):
+            # Create Document nodes for documents seen for the first time
+            for doc_id in dict.fromkeys(chunk["doc_id"] for chunk in batch):
+                if doc_id not in doc_ids:
+                    session.execute_write(create_document_node, doc_id, doc_id)
+                    doc_ids.add(doc_id)
+
+            # Create Chunk nodes
+            session.execute_write(create_chunk_nodes, batch)
+            total_chunks += len(batch)
+            print(f"Created {total_chunks} chunks...")
+
+    print(f"Neo4j graph built: {len(doc_ids)} documents, {total_chunks} chunks")
+
+def replace_document_in_graph(doc_id, chunks):
+    """Swap one document's chunk nodes for new ones without touching the rest of the graph."""
+    with get_driver().session() as session:
+        session.execute_write(delete_document_chunks, doc_id)
+    build_graph(chunks, clear_existing=False)
 
 
 # # graph.py
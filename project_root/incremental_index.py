@@ -0,0 +1,144 @@
+# incremental_index.py
+import time
+import threading
+import numpy as np
+from config import VECTOR_DIM, CHUNK_STORE_PATH, EMBEDDING_CACHE_ENABLED, FAISS_INDEX_TYPE
+from chunk_store import ChunkStore
+from embedding_cache import get_embedding_cache
+from embeddings import encode_texts, new_faiss_index, is_compressed, load_faiss_index, save_faiss_index, _hnsw
+
+# -----------------------------
+# Incremental FAISS Index
+# -----------------------------
+class IncrementalIndex:
+    """
+    The saved index + chunk store, updated one document at a time.
+    Vectors live under stable ids derived from chunk_id, so adding, deleting
+    or replacing a document only embeds / removes that document's chunks;
+    nothing else is re-embedded. Changes are in memory until save(), which
+    publishes index and metadata together (embeddings.save_faiss_index).
+    Opening and saving still read and write the whole index and chunk store
+    (snapshots are immutable), so that part of an update grows with the index;
+    a sharded index (sharded_index.py) bounds it by the shard's size.
+    A new index is created with index_type. HNSW indexes cannot delete vectors
+    and are rejected; update them by rebuilding.
+    """
+
+    def __init__(self, path: str = CHUNK_STORE_PATH, vector_dim: int = VECTOR_DIM, use_cache: bool = EMBEDDING_CACHE_ENABLED,
+                 index_type: str = FAISS_INDEX_TYPE):
+        self.path = path
+        self.vector_dim = vector_dim
+        self.index_type = index_type
+        self.cache = get_embedding_cache() if use_cache else None
+        self._lock = threading.Lock()
+        try:
+            self.index, self.metadata = load_faiss_index(path)
+        except FileNotFoundError:
+            print(f"No index at {path}; starting an empty one")
+            self.index, self.metadata = new_faiss_index(vector_dim, index_type), ChunkStore.from_chunks([])
+            if is_compressed(index_type):
+                self.metadata.vectors = np.empty((0, vector_dim), dtype=np.float32)
+        if _hnsw(self.index) is not None:
+            raise ValueError(f"The index at {path} is HNSW, which cannot delete vectors; "
+                             "rebuild it (embeddings.build_faiss_from_ocr) or use a flat or IVF index type")
+
+    def __len__(self):
+        return len(self.metadata)
+
+    def documents(self) -> list:
+        """Ids of the documents that currently have chunks in the index."""
+        present = np.unique(np.asarray(self.metadata.doc_index))
+        return [self.metadata.doc_ids[i] for i in present]
+
+    def add_document(self, doc_id: str, chunks) -> int:
+        """
+        Embed and add one document's chunks (dicts as produced by chunking.iter_pdf_chunks).
+        Raises ValueError if the document is already indexed; use replace_document.
+        Returns the number of chunks added.
+        """
+        with self._lock:
+            if len(self.metadata.rows_of_doc(doc_id)):
+                raise ValueError(f"Document {doc_id} is already indexed; use replace_document")
+            return self._add(doc_id, chunks)
+
+    def delete_document(self, doc_id: str) -> int:
+        """Remove a document's vectors and metadata. Returns the number of chunks removed."""
+        with self._lock:
+            return self._delete(doc_id)
+
+    def replace_document(self, doc_id: str, chunks) -> tuple:
+        """Swap a changed document's chunks for new ones. Returns (removed, added)."""
+        with self._lock:
+            removed = self._delete(doc_id)
+            return removed, self._add(doc_id, chunks)
+
+    def save(self):
+        """Persist index and metadata as one unit."""
+        with self._lock:
+            save_faiss_index(self.index, self.metadata, self.path)
+
+    def _add(self, doc_id: str, chunks) -> int:
+        chunks = [chunk for chunk in chunks if chunk["doc_id"] == doc_id]
+        if not chunks:
+            return 0
+        started = time.perf_counter()
+        new_rows = ChunkStore.from_chunks(chunks)
+        if len(np.unique(new_rows.ids)) != len(new_rows) or (self.metadata.rows_for_ids(new_rows.ids) >= 0).any():
+            raise ValueError(f"Duplicate chunk ids in document {doc_id}")
+        self._append(new_rows, encode_texts([chunk["text"] for chunk in chunks], cache=self.cache))
+        print(f"Added {len(chunks)} chunks of {doc_id} in {time.perf_counter() - started:.1f}s")
+        return len(chunks)
+
+    def _append(self, new_rows: ChunkStore, vectors):
+        """Add rows with their vectors to the index and metadata."""
+        if not self.index.is_trained:
+            # First document into an empty trainable index: train on it
+            self.index = new_faiss_index(self.vector_dim, self.index_type, vectors)
+        self.index.add_with_ids(vectors, np.asarray(new_rows.ids, dtype=np.int64))
+        if self.metadata.vectors is not None:
+            new_rows.vectors = vectors
+        self.metadata = ChunkStore.concat([self.metadata, new_rows])
+
+    def _row_vectors(self, rows):
+        """Stored vectors of rows: re-rank copy, else reconstructed, else re-encoded (an embedding cache hit)."""
+        if self.metadata.vectors is not None:
+            return np.asarray(self.metadata.vectors[rows], dtype=np.float32)
+        try:
+            return self.index.reconstruct_batch(np.ascontiguousarray(np.asarray(self.metadata.ids)[rows],
+                                                                     dtype=np.int64))
+        except RuntimeError:
+            # IVF without a direct map
+            return encode_texts([self.metadata.text(row) for row in rows], cache=self.cache)
+
+    def _delete(self, doc_id: str) -> int:
+        rows = self.metadata.rows_of_doc(doc_id)
+        if not len(rows):
+            return 0
+        # Deduplicated text whose kept copy is in this document lives on in the
+        # other documents: promote their first location to be the kept copy
+        promoted, promoted_rows = [], []
+        for row in rows:
+            others = [loc for loc in self.metadata.provenance.get(int(row), []) if loc["doc_id"] != doc_id]
+            if others:
+                promoted.append(({**others[0], "text": self.metadata.text(row), "ocr_confidence": None}, others[1:]))
+                promoted_rows.append(row)
+        vectors = self._row_vectors(promoted_rows) if promoted else None
+
+        self.index.remove_ids(np.ascontiguousarray(np.asarray(self.metadata.ids)[rows], dtype=np.int64))
+        keep = np.setdiff1d(np.arange(len(self.metadata)), rows, assume_unique=True)
+        self.metadata = self.metadata.take(keep)
+        # This document's duplicates of text kept elsewhere are gone too
+        for row, locations in list(self.metadata.provenance.items()):
+            remaining = [loc for loc in locations if loc["doc_id"] != doc_id]
+            if remaining:
+                self.metadata.provenance[row] = remaining
+            else:
+                del self.metadata.provenance[row]
+
+        if promoted:
+            new_rows = ChunkStore.from_chunks([chunk for chunk, _ in promoted])
+            new_rows.provenance = {k: rest for k, (_, rest) in enumerate(promoted) if rest}
+            self._append(new_rows, vectors)
+            print(f"Moved {len(promoted)} deduplicated chunks of {doc_id} to their other documents")
+        print(f"Removed {len(rows)} chunks of {doc_id}")
+        return len(rows)
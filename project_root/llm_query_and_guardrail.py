@@ -1,37 +1,103 @@
 # llm_query_and_guardrail.py
 import json
-from config import FAISS_INDEX_PATH, FAISS_METADATA_PATH, GROK_API_KEY, TOP_K
-from embeddings import model, load_faiss_index
-from neo4j import GraphDatabase
-from groq import Groq
+import threading
+from config import FAISS_NUM_SHARDS, GROK_API_KEY, TOP_K
+from embeddings import search_faiss_batch
+from chunk_store import ChunkFilter
 import numpy as np
 
 # -----------------------------
-# Initialize
+# Initialize (lazily)
 # -----------------------------
-client = Groq(api_key=GROK_API_KEY)
-
-# Neo4j driver (optional)
-driver = None
-try:
-    from config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
-    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
-except ImportError:
-    print("Neo4j config not found. Only FAISS retrieval will work.")
-
-# Load FAISS index and metadata
-faiss_index, metadata = load_faiss_index(FAISS_INDEX_PATH)
+# Nothing is created at import: the Groq client, the Neo4j driver and the
+# FAISS index are each built once, on first use, under a lock.
+_client = None
+_serving = None
+_sharded = None
+_client_lock = threading.Lock()
+_serving_lock = threading.Lock()
+_sharded_lock = threading.Lock()
+
+def get_client():
+    """Return the Groq client, created once on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from groq import Groq
+                _client = Groq(api_key=GROK_API_KEY)
+    return _client
+
+def get_driver():
+    """Return the Neo4j driver, or None when Neo4j is not available (only FAISS retrieval will work)."""
+    try:
+        from graph import get_driver as get_graph_driver
+        return get_graph_driver()
+    except ImportError:
+        return None
+
+def get_serving_index():
+    """
+    Return the ServingIndex, opened once on first use. It follows the
+    snapshots ingestion publishes (hot reload, no restart needed), and with
+    FAISS_SERVE_MMAP maps them read-only so worker processes share one
+    page-cache copy.
+    """
+    global _serving
+    if _serving is None:
+        with _serving_lock:
+            if _serving is None:
+                from serving_index import ServingIndex
+                _serving = ServingIndex()
+    return _serving
+
+def get_sharded_index():
+    """Return the ShardedIndex (used when FAISS_NUM_SHARDS > 1), opened once on first use."""
+    global _sharded
+    if _sharded is None:
+        with _sharded_lock:
+            if _sharded is None:
+                from sharded_index import ShardedIndex
+                _sharded = ShardedIndex()
+    return _sharded
+
+def get_faiss_index():
+    """Return (faiss_index, metadata) of the current snapshot; take it once per query so the pair stays consistent."""
+    snapshot = get_serving_index().current()
+    return snapshot.index, snapshot.metadata
 
 
 # -----------------------------
 # Retrieval Functions
 # -----------------------------
-def semantic_search(query, top_k=5):
-    """Return top_k relevant chunks using FAISS."""
-    q_vec = model.encode(query).reshape(1, -1)
-    distances, indices = faiss_index.search(q_vec, top_k)
-    results = [metadata[idx] for idx in indices[0] if idx < len(metadata)]
-    return results
+def semantic_search(query, top_k=5, nprobe=None, ef_search=None, doc_ids=None, page_range=None, min_confidence=None):
+    """
+    Return top_k relevant chunks using FAISS (nprobe / ef_search tune IVF / HNSW indexes).
+    doc_ids, page_range (first, last) and min_confidence (OCR) restrict the
+    search to matching chunks; the filter is applied inside the FAISS search.
+    """
+    return semantic_search_batch([query], top_k, nprobe=nprobe, ef_search=ef_search, doc_ids=doc_ids,
+                                 page_range=page_range, min_confidence=min_confidence)[0]
+
+
+def semantic_search_batch(queries, top_k=5, nprobe=None, ef_search=None, doc_ids=None, page_range=None,
+                          min_confidence=None):
+    """
+    semantic_search for a list of queries in one batched encode + FAISS search; one chunk list per query.
+    With FAISS_NUM_SHARDS > 1 every shard is searched in parallel and the results merged.
+    The filter arguments apply to every query.
+    """
+    chunk_filter = None
+    if doc_ids is not None or page_range is not None or min_confidence is not None:
+        chunk_filter = ChunkFilter(doc_ids, page_range, min_confidence)
+    if FAISS_NUM_SHARDS > 1:
+        results = get_sharded_index().search_batch(queries, top_k, nprobe=nprobe, ef_search=ef_search,
+                                                   chunk_filter=chunk_filter)
+    else:
+        faiss_index, metadata = get_faiss_index()
+        results = search_faiss_batch(queries, faiss_index, metadata, top_k, nprobe=nprobe, ef_search=ef_search,
+                                     chunk_filter=chunk_filter)
+    return [[hit["chunk"] for hit in hits] for hits in results]
 
 
 def graph_search_entities(query, top_k=5):
@@ -39,6 +105,7 @@ def graph_search_entities(query, top_k=5):
     Retrieve chunk_ids from Neo4j that are linked to entities in the query.
     Simple entity matching; can be expanded for relationships or graph traversal.
     """
+    driver = get_driver()
     if driver is None:
         return []
 
@@ -93,7 +160,7 @@ def retrieve_chunks_for_context(query, top_k=TOP_K):
 # -----------------------------
 def call_llm(messages, temperature=1, max_tokens=1024):
     """Call Groq LLM with streaming response."""
-    completion = client.chat.completions.create(
+    completion = get_client().chat.completions.create(
         model="meta-llama/llama-4-scout-17b-16e-instruct",
         messages=messages,
         temperature=temperature,
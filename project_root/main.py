@@ -1,7 +1,6 @@
 # main.py
 import argparse
 from ocr import ocr_multiple_pdfs
-from chunking import chunk_all_pdfs
 from embeddings import build_faiss_from_ocr
 from graph import build_graph
 from entities import enrich_graph_with_entities
@@ -25,19 +24,17 @@ def main(args):
         print("0️⃣ Performing OCR on PDFs")
         ocr_multiple_pdfs(pdf_paths)
 
-        print("\n1️⃣ Chunking PDFs")
-        chunks = chunk_all_pdfs()
-        print(f"✅ Total chunks prepared: {len(chunks)}")
-
-        print("\n2️⃣ Building embeddings (FAISS)")
+        print("\n1️⃣ Chunking PDFs & building embeddings (FAISS)")
         index, metadata = build_faiss_from_ocr()
         print(f"✅ FAISS index created with {len(metadata)} chunks")
 
-        print("\n3️⃣ Ingesting chunks into Neo4j")
-        build_graph(chunks)
+        print("\n2️⃣ Ingesting chunks into Neo4j")
+        # Reuse the indexed chunks (deduplicated ones expanded back to every
+        # location) instead of chunking the corpus a second time
+        build_graph(metadata.all_chunks())
         print("✅ Neo4j graph populated")
 
-        print("\n4️⃣ Extracting entities & enriching graph")
+        print("\n3️⃣ Extracting entities & enriching graph")
         enrich_graph_with_entities()
         print("✅ Entities extracted and graph enriched")
 
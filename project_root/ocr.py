@@ -1,45 +1,555 @@
 # ocr.py
 import os
+import json
+import time
+import queue
+import threading
+from collections import deque
+from contextlib import nullcontext
+from functools import partial
 from pathlib import Path
-from pdf2image import convert_from_path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, Future, as_completed
+from pdf2image import convert_from_path, pdfinfo_from_path
+from PyPDF2 import PdfReader
 import pytesseract
 from tqdm import tqdm
-from config import OCR_CHUNKS_FOLDER, SUPPORTED_EXTENSIONS
+from config import (
+    OCR_CHUNKS_FOLDER,
+    SUPPORTED_EXTENSIONS,
+    OCR_DPI,
+    OCR_LANG,
+    OCR_ADAPTIVE_DPI,
+    OCR_LOW_DPI,
+    OCR_CONFIDENCE_THRESHOLD,
+    OCR_BACKEND,
+    OCR_WORKERS,
+    OCR_MAX_RASTER_MB,
+    OCR_CONCURRENT_DOCS,
+    TEXT_LAYER_ENABLED,
+    TEXT_LAYER_MIN_CHARS,
+    TEXT_LAYER_MIN_ALNUM_RATIO,
+    OCR_CACHE_ENABLED,
+    OCR_OUTPUT_FORMAT
+)
+from ocr_cache import get_ocr_cache, document_key, page_key, text_key
+from ocr_store import write_packed, pack_path
 
-def ocr_pdf(pdf_path: str, output_folder: str = OCR_CHUNKS_FOLDER):
+# -----------------------------
+# Native Text Layer
+# -----------------------------
+def has_usable_text(text: str, min_chars: int = TEXT_LAYER_MIN_CHARS,
+                    min_alnum_ratio: float = TEXT_LAYER_MIN_ALNUM_RATIO) -> bool:
+    """
+    Decide whether an embedded text layer is good enough to skip OCR.
+    Requires enough non-whitespace characters, most of them alphanumeric;
+    broken font encodings tend to produce symbol/CID soup that fails the ratio.
+    """
+    chars = [c for c in text if not c.isspace()]
+    if len(chars) < min_chars:
+        return False
+    return sum(c.isalnum() for c in chars) / len(chars) >= min_alnum_ratio
+
+def extract_text_layer(pdf_path: str) -> dict:
+    """
+    Read the embedded text of every page.
+    Returns {page_number: text} for pages whose text layer is usable; other
+    pages (scans, images, garbage encodings) are left for OCR.
+    """
+    usable = {}
+    try:
+        reader = PdfReader(str(pdf_path))
+        for i, page in enumerate(reader.pages):
+            text = (page.extract_text() or "").strip()
+            if has_usable_text(text):
+                usable[i + 1] = text
+    except Exception as e:
+        # Malformed or encrypted PDFs: fall back to OCR for every page
+        print(f"Could not read text layer of {pdf_path}: {e}")
+        return {}
+    return usable
+
+# -----------------------------
+# Streaming Rasterization
+# -----------------------------
+def get_page_count(pdf_path: str) -> int:
+    """Return the number of pages in a PDF without rendering it."""
+    return int(pdfinfo_from_path(str(pdf_path))["Pages"])
+
+def estimate_page_bytes(dpi: int = OCR_DPI) -> int:
+    """
+    Estimate the in-memory size of one rendered RGB page.
+    Uses US Letter (8.5 x 11 in), which is slightly larger than A4.
+    """
+    return int(8.5 * dpi) * int(11 * dpi) * 3
+
+def pages_within_budget(dpi: int = OCR_DPI, max_raster_mb: int = OCR_MAX_RASTER_MB) -> int:
+    """How many rendered pages fit in the raster memory ceiling (at least one)."""
+    return max(1, (max_raster_mb * 1024 * 1024) // estimate_page_bytes(dpi))
+
+def _page_ranges(page_numbers: list, batch_pages: int):
+    """Group sorted page numbers into contiguous (first, last) ranges of at most batch_pages."""
+    ranges = []
+    for n in page_numbers:
+        if ranges and n == ranges[-1][1] + 1 and n - ranges[-1][0] < batch_pages:
+            ranges[-1][1] = n
+        else:
+            ranges.append([n, n])
+    return ranges
+
+def iter_page_images(pdf_path: str, dpi: int = OCR_DPI, batch_pages: int = None, page_numbers: list = None):
+    """
+    Yield (page_number, image) for every page of a PDF, or only page_numbers.
+    Pages are rendered in bounded ranges of batch_pages, so memory stays
+    flat regardless of the document length.
+    """
+    if batch_pages is None:
+        batch_pages = pages_within_budget(dpi)
+    if page_numbers is None:
+        page_numbers = range(1, get_page_count(pdf_path) + 1)
+
+    for first_page, last_page in _page_ranges(sorted(page_numbers), batch_pages):
+        images = convert_from_path(pdf_path, dpi=dpi, first_page=first_page, last_page=last_page)
+        images.reverse()
+        page_number = first_page
+        # Pop as we go so each image can be freed once the consumer is done with it
+        while images:
+            yield page_number, images.pop()
+            page_number += 1
+
+def _bounded_map(executor, fn, items, max_in_flight: int, lookup=None, slots=None):
+    """
+    Like executor.map, but keeps at most max_in_flight items submitted at a time.
+    executor.map drains the whole input up front, which would pull every
+    rendered page into memory. Results are yielded in input order.
+    If lookup(item) returns a result, the item is answered without a worker.
+    slots is an optional semaphore shared between callers: one slot is held
+    per submitted item until its worker finishes, bounding in-flight items globally.
+    """
+    pending = deque()
+    for item in items:
+        result = lookup(item) if lookup is not None else None
+        if result is not None:
+            future = Future()
+            future.set_result(result)
+        else:
+            if slots is not None:
+                slots.acquire()
+            future = executor.submit(fn, item)
+            if slots is not None:
+                # Release when the worker is done (not when consumed) so callers can't deadlock each other
+                future.add_done_callback(lambda _: slots.release())
+        pending.append(future)
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+# -----------------------------
+# OCR Backends
+# -----------------------------
+class PytesseractBackend:
+    """Runs the tesseract CLI per page; pays process startup and model loading on every call."""
+    name = "pytesseract"
+
+    def __init__(self, lang: str = OCR_LANG):
+        self.lang = lang
+
+    def image_to_text(self, image) -> str:
+        return pytesseract.image_to_string(image, lang=self.lang).strip()
+
+    def recognize(self, image):
+        """
+        OCR a page and return (text, mean word confidence 0-100 or None).
+        Text is rebuilt from image_to_data so the page is only OCR'd once:
+        words joined by spaces, lines by newlines, paragraphs by blank lines.
+        """
+        data = pytesseract.image_to_data(image, lang=self.lang, output_type=pytesseract.Output.DICT)
+        paragraphs = {}
+        confidences = []
+        for i, word in enumerate(data["text"]):
+            if not word.strip():
+                continue
+            paragraph = (data["block_num"][i], data["par_num"][i])
+            paragraphs.setdefault(paragraph, {}).setdefault(data["line_num"][i], []).append(word)
+            conf = float(data["conf"][i])
+            if conf >= 0:
+                confidences.append(conf)
+        text = "\n\n".join(
+            "\n".join(" ".join(words) for words in lines.values()) for lines in paragraphs.values()
+        )
+        confidence = sum(confidences) / len(confidences) if confidences else None
+        return text.strip(), confidence
+
+    def close(self):
+        pass
+
+class TesserocrBackend:
+    """Keeps one in-process tesseract engine (tesserocr) loaded and reuses it for every page."""
+    name = "tesserocr"
+
+    def __init__(self, lang: str = OCR_LANG):
+        import tesserocr
+        self.lang = lang
+        self.api = tesserocr.PyTessBaseAPI(lang=lang)
+
+    def image_to_text(self, image) -> str:
+        self.api.SetImage(image)
+        return self.api.GetUTF8Text().strip()
+
+    def recognize(self, image):
+        """OCR a page and return (text, mean word confidence 0-100 or None)."""
+        text = self.image_to_text(image)
+        confidences = self.api.AllWordConfidences()
+        return text, (sum(confidences) / len(confidences) if confidences else None)
+
+    def close(self):
+        self.api.End()
+
+OCR_BACKENDS = {
+    "pytesseract": PytesseractBackend,
+    "tesserocr": TesserocrBackend
+}
+
+def create_ocr_backend(backend: str = OCR_BACKEND, lang: str = OCR_LANG):
+    """Instantiate an OCR backend by name, falling back to pytesseract if its binding is missing."""
+    if backend not in OCR_BACKENDS:
+        raise ValueError(f"Unknown OCR backend: {backend}")
+    try:
+        return OCR_BACKENDS[backend](lang)
+    except ImportError:
+        print(f"OCR backend '{backend}' is not installed. Falling back to pytesseract.")
+        return PytesseractBackend(lang)
+
+_engines = threading.local()
+
+def get_ocr_engine(backend: str = OCR_BACKEND, lang: str = OCR_LANG):
+    """
+    Return this thread's long-lived OCR engine, creating it on first use.
+    Engines are not thread-safe, so each thread (and each pool worker) gets its own.
+    """
+    engine = getattr(_engines, "engine", None)
+    if engine is None or engine.lang != lang or getattr(_engines, "requested", None) != backend:
+        if engine is not None:
+            engine.close()
+        engine = create_ocr_backend(backend, lang)
+        _engines.engine = engine
+        _engines.requested = backend
+    return engine
+
+# -----------------------------
+# Page-level OCR
+# -----------------------------
+def _init_ocr_worker():
+    """
+    Pin tesseract to a single thread inside each worker process and load
+    the worker's engine up front, so the first page doesn't pay for it.
+    Parallelism comes from the pool, so letting every worker spawn its own
+    OpenMP threads only oversubscribes the cores.
+    """
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    get_ocr_engine()
+
+def ocr_page(image, lang: str = OCR_LANG) -> str:
+    """OCR a single rendered page image and return the stripped text."""
+    return get_ocr_engine(OCR_BACKEND, lang).image_to_text(image)
+
+def ocr_page_with_confidence(image, lang: str = OCR_LANG):
+    """OCR a single rendered page image and return (text, mean word confidence or None)."""
+    return get_ocr_engine(OCR_BACKEND, lang).recognize(image)
+
+def _ocr_page_task(task) -> dict:
+    """Worker entry point: OCR a (page_number, image, cache_key, dpi) task into a page record."""
+    page_number, image, key, dpi = task
+    text, confidence = ocr_page_with_confidence(image)
+    return {"page_number": page_number, "key": key, "text": text, "confidence": confidence,
+            "dpi": dpi, "source": "ocr", "cached": False}
+
+def save_page_text(pdf_output_dir: Path, pdf_name: str, page_number: int, text: str) -> Path:
+    """Save page text as <pdf>_p<N>_c1.txt inside the PDF's output folder."""
+    chunk_file = pdf_output_dir / f"{pdf_name}_p{page_number}_c1.txt"
+    with open(chunk_file, "w", encoding="utf-8") as f:
+        f.write(text)
+    return chunk_file
+
+def save_page_manifest(pdf_output_dir: Path, pdf_name: str, pages: list) -> Path:
+    """
+    Save per-page extraction details as <pdf>_pages.json next to the page texts.
+    Each entry: {"page_number", "source" ("text_layer" | "ocr"), "chars",
+    "confidence" (mean OCR word confidence, None for text-layer pages), "dpi"}.
+    """
+    manifest_file = pdf_output_dir / f"{pdf_name}_pages.json"
+    with open(manifest_file, "w", encoding="utf-8") as f:
+        json.dump(sorted(pages, key=lambda p: p["page_number"]), f, indent=2)
+    return manifest_file
+
+class _PageOutput:
+    """A document's page texts, written as .txt files + <pdf>_pages.json or as one <pdf>.ocrpack."""
+
+    def __init__(self, pdf_output_dir: Path, pdf_name: str, output_format: str = OCR_OUTPUT_FORMAT):
+        if output_format not in ("txt", "packed"):
+            raise ValueError(f"Unknown OCR output format: {output_format}")
+        self.pdf_output_dir = pdf_output_dir
+        self.pdf_name = pdf_name
+        self.output_format = output_format
+        self.manifest = []
+        self.packed_pages = []
+
+    def save(self, record):
+        page_meta = {
+            "page_number": record["page_number"],
+            "source": record.get("source", "ocr"),
+            "chars": len(record["text"]),
+            "confidence": record.get("confidence"),
+            "dpi": record.get("dpi")
+        }
+        self.manifest.append(page_meta)
+        if self.output_format == "packed":
+            self.packed_pages.append({**page_meta, "text": record["text"]})
+        else:
+            save_page_text(self.pdf_output_dir, self.pdf_name, record["page_number"], record["text"])
+
+    def finish(self):
+        if self.output_format == "packed":
+            write_packed(self.pdf_output_dir, self.pdf_name, self.packed_pages)
+            # Drop any per-page layout left from an earlier run so the two can't disagree
+            for stale in self.pdf_output_dir.glob(f"{self.pdf_name}_p*_c1.txt"):
+                stale.unlink()
+            self.pdf_output_dir.joinpath(f"{self.pdf_name}_pages.json").unlink(missing_ok=True)
+        else:
+            save_page_manifest(self.pdf_output_dir, self.pdf_name, self.manifest)
+            # Readers prefer the pack, so a stale one would shadow these texts
+            pack_path(self.pdf_output_dir, self.pdf_name).unlink(missing_ok=True)
+
+def _restore_cached_document(cache, doc_key: str, output: _PageOutput):
+    """Write a fully cached document's pages to output; returns the page count, or None on a miss."""
+    records = cache.get_document(doc_key)
+    if records is None:
+        return None
+    for page_number, record in enumerate(records, 1):
+        output.save({**record, "page_number": page_number})
+    output.finish()
+    return len(records)
+
+def _adaptive_dpi_results(run_pass, page_numbers: list, remember):
+    """
+    OCR page_numbers at OCR_LOW_DPI, then re-OCR pages below OCR_CONFIDENCE_THRESHOLD
+    at OCR_DPI and keep the more confident result. Yields each page's final record.
+    """
+    low_confidence = {}
+    for result in run_pass(page_numbers, OCR_LOW_DPI):
+        confidence = result["confidence"]
+        if confidence is None or confidence < OCR_CONFIDENCE_THRESHOLD:
+            remember(result)
+            result["cached"] = True
+            low_confidence[result["page_number"]] = result
+        else:
+            yield result
+
+    if low_confidence:
+        print(f"Adaptive DPI: re-OCR'ing {len(low_confidence)}/{len(page_numbers)} pages at {OCR_DPI} DPI")
+        for result in run_pass(sorted(low_confidence), OCR_DPI):
+            first = low_confidence[result["page_number"]]
+            # Keep whichever pass tesseract was more confident about
+            if first["confidence"] is not None and (result["confidence"] is None
+                                                    or first["confidence"] > result["confidence"]):
+                remember(result)
+                result = first
+            yield result
+
+def ocr_pdf(pdf_path: str, output_folder: str = OCR_CHUNKS_FOLDER, workers: int = OCR_WORKERS,
+            max_raster_mb: int = OCR_MAX_RASTER_MB, use_cache: bool = OCR_CACHE_ENABLED,
+            use_text_layer: bool = TEXT_LAYER_ENABLED, executor=None, page_slots=None,
+            progress: bool = True, output_format: str = OCR_OUTPUT_FORMAT,
+            adaptive_dpi: bool = OCR_ADAPTIVE_DPI, progress_position: int = None):
     """
     Perform OCR on a scanned PDF (including handwritten text if possible)
     and save each page as a separate text file.
+    use_text_layer: take pages with a usable embedded text layer as-is.
+    use_cache: reuse OCR of an unchanged PDF, or of unchanged pages.
+    workers / executor / page_slots: OCR pages in a (shared) process pool.
+    max_raster_mb: cap on page images held at once.
+    output_format: "txt" or "packed" (one <pdf>.ocrpack, see ocr_store).
+    adaptive_dpi: OCR at OCR_LOW_DPI first, low-confidence pages again at OCR_DPI.
+    progress_position: terminal line of this document's progress bar.
     """
     pdf_name = Path(pdf_path).stem
     pdf_output_dir = Path(output_folder) / pdf_name
     pdf_output_dir.mkdir(parents=True, exist_ok=True)
 
     print(f"Performing OCR on {pdf_name}...")
-    
-    # Convert PDF pages to images
-    pages = convert_from_path(pdf_path, dpi=300)
-    
-    for i, page in enumerate(tqdm(pages, desc="Processing pages")):
-        # OCR each page
-        text = pytesseract.image_to_string(page, lang="eng")  # add lang='eng+...'
-        text = text.strip()
-        
-        # Save page text
-        chunk_file = pdf_output_dir / f"{pdf_name}_p{i+1}_c1.txt"
-        with open(chunk_file, "w", encoding="utf-8") as f:
-            f.write(text)
-    
+
+    output = _PageOutput(pdf_output_dir, pdf_name, output_format)
+
+    cache = get_ocr_cache() if use_cache else None
+    if cache is not None:
+        doc_key = document_key(pdf_path, OCR_DPI, OCR_LANG, OCR_BACKEND, use_text_layer,
+                               adaptive_dpi and (OCR_LOW_DPI, OCR_CONFIDENCE_THRESHOLD))
+        restored = _restore_cached_document(cache, doc_key, output)
+        if restored is not None:
+            print(f"OCR cache hit: reused {restored} pages. Chunks saved to {pdf_output_dir}")
+            return pdf_output_dir
+
+    total_pages = get_page_count(pdf_path)
+    page_keys = {}
+
+    def remember(result):
+        """Store a freshly OCR'd page in the cache."""
+        if cache is not None and not result["cached"]:
+            cache.put_page(result["key"], {k: result[k] for k in ("text", "source", "confidence", "dpi")})
+
+    def handle(result):
+        """Accept a page's final result."""
+        remember(result)
+        if cache is not None:
+            page_keys[result["page_number"]] = result["key"]
+        output.save(result)
+
+    # Fast path: pages that carry their own text
+    text_layer = extract_text_layer(pdf_path) if use_text_layer else {}
+    for page_number, text in text_layer.items():
+        key = text_key(text) if cache is not None else None
+        handle({"page_number": page_number, "key": key, "text": text, "confidence": None,
+                "dpi": None, "source": "text_layer", "cached": False})
+
+    ocr_page_numbers = [n for n in range(1, total_pages + 1) if n not in text_layer]
+    if text_layer:
+        print(f"Text layer used for {len(text_layer)}/{total_pages} pages; OCR needed for {len(ocr_page_numbers)}")
+
+    if ocr_page_numbers:
+        own_pool = executor is None and workers > 1 and len(ocr_page_numbers) > 1
+        pool_context = (ProcessPoolExecutor(max_workers=min(workers, len(ocr_page_numbers)),
+                                            initializer=_init_ocr_worker)
+                        if own_pool else nullcontext(executor))
+
+        def lookup(task):
+            if cache is None:
+                return None
+            page_number, _, key, dpi = task
+            record = cache.get_page(key)
+            if record is None:
+                return None
+            return {"source": "ocr", "confidence": None, "dpi": dpi, **record,
+                    "page_number": page_number, "key": key, "cached": True}
+
+        def run_pass(pool, page_numbers, dpi):
+            """Yield page records for page_numbers rendered at dpi, in page order."""
+            page_budget = pages_within_budget(dpi, max_raster_mb)
+            render_batch = page_budget if executor is not None else max(1, page_budget // 2)
+            pages = iter_page_images(pdf_path, dpi=dpi, batch_pages=render_batch, page_numbers=page_numbers)
+            tasks = ((page_number, image,
+                      page_key(image, dpi, OCR_LANG, OCR_BACKEND) if cache is not None else None, dpi)
+                     for page_number, image in pages)
+            if pool is None:
+                results = (lookup(task) or _ocr_page_task(task) for task in tasks)
+            elif executor is not None:
+                # Shared pool: in-flight pages are bounded globally by page_slots
+                results = _bounded_map(pool, _ocr_page_task, tasks, len(page_numbers),
+                                       lookup=lookup, slots=page_slots)
+            else:
+                results = _bounded_map(pool, _ocr_page_task, tasks, max(1, page_budget - render_batch),
+                                       lookup=lookup, slots=page_slots)
+            desc = f"Processing pages ({dpi} DPI)" if progress_position is None else f"{pdf_name} ({dpi} DPI)"
+            yield from tqdm(results, total=len(page_numbers), desc=desc, disable=not progress,
+                            position=progress_position, leave=progress_position is None)
+
+        with pool_context as pool:
+            if adaptive_dpi:
+                results = _adaptive_dpi_results(partial(run_pass, pool), ocr_page_numbers, remember)
+            else:
+                results = run_pass(pool, ocr_page_numbers, OCR_DPI)
+            for result in results:
+                handle(result)
+
+    output.finish()
+
+    if cache is not None:
+        cache.put_document(doc_key, [page_keys[n] for n in sorted(page_keys)])
+        cache.flush()
+        print(f"OCR cache: {cache.stats()}")
+
     print(f"OCR complete. Chunks saved to {pdf_output_dir}")
     return pdf_output_dir
 
-def ocr_multiple_pdfs(pdf_paths: list):
+def ocr_multiple_pdfs(pdf_paths: list, workers: int = OCR_WORKERS, max_raster_mb: int = OCR_MAX_RASTER_MB,
+                      concurrent_docs: int = OCR_CONCURRENT_DOCS):
     """
-    Perform OCR on multiple PDFs
+    Perform OCR on multiple PDFs.
+    Documents are processed shortest-first so small uploads become searchable
+    early. Up to concurrent_docs documents run at once, all feeding one pool of
+    `workers` processes; half of max_raster_mb is split between the documents'
+    render buffers and half bounds pages in flight across all documents.
+    Each running document shows its own pages-done progress bar.
+    Returns a per-document report: pdf, pages, seconds, pages_per_sec, output_dir.
     """
+    supported = []
     for pdf in pdf_paths:
         ext = Path(pdf).suffix.lower()
         if ext in SUPPORTED_EXTENSIONS:
-            ocr_pdf(pdf)
+            supported.append(pdf)
         else:
             print(f"Skipping unsupported file {pdf}")
+
+    page_counts = {}
+    for pdf in supported:
+        try:
+            page_counts[pdf] = get_page_count(pdf)
+        except Exception as e:
+            print(f"Could not read page count of {pdf}: {e}")
+            page_counts[pdf] = float("inf")
+    supported.sort(key=lambda pdf: page_counts[pdf])
+
+    reports = []
+    started = time.perf_counter()
+
+    def process(pdf, **ocr_kwargs):
+        t0 = time.perf_counter()
+        output_dir = ocr_pdf(pdf, **ocr_kwargs)
+        seconds = time.perf_counter() - t0
+        pages = page_counts[pdf] if page_counts[pdf] != float("inf") else 0
+        report = {
+            "pdf": str(pdf),
+            "pages": pages,
+            "seconds": seconds,
+            "pages_per_sec": pages / seconds if seconds > 0 else 0.0,
+            "output_dir": output_dir
+        }
+        reports.append(report)
+        print(f"[{len(reports)}/{len(supported)}] {Path(pdf).name}: {pages} pages in "
+              f"{seconds:.1f}s ({report['pages_per_sec']:.2f} pages/s)")
+        return report
+
+    if workers <= 1 or concurrent_docs <= 1 or len(supported) <= 1:
+        for pdf in supported:
+            process(pdf, workers=workers, max_raster_mb=max_raster_mb)
+    else:
+        page_slots = threading.BoundedSemaphore(max(1, pages_within_budget(OCR_DPI, max_raster_mb // 2)))
+        doc_raster_mb = max(1, max_raster_mb // (2 * concurrent_docs))
+        # One progress-bar line per running document
+        bar_positions = queue.Queue()
+        for position in range(concurrent_docs):
+            bar_positions.put(position)
+
+        def process_with_bar(pdf, **ocr_kwargs):
+            position = bar_positions.get()
+            try:
+                return process(pdf, progress_position=position, **ocr_kwargs)
+            finally:
+                bar_positions.put(position)
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_ocr_worker) as pool, \
+                ThreadPoolExecutor(max_workers=concurrent_docs) as scheduler:
+            # The scheduler starts documents in submission order, i.e. shortest first
+            futures = [
+                scheduler.submit(process_with_bar, pdf, max_raster_mb=doc_raster_mb, executor=pool,
+                                 page_slots=page_slots)
+                for pdf in supported
+            ]
+            for future in as_completed(futures):
+                future.result()
+
+    total_pages = sum(r["pages"] for r in reports)
+    elapsed = time.perf_counter() - started
+    if reports:
+        print(f"OCR finished for {len(reports)} documents: {total_pages} pages in {elapsed:.1f}s "
+              f"({total_pages / elapsed if elapsed > 0 else 0.0:.2f} pages/s)")
+    return reports
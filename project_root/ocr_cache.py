@@ -0,0 +1,204 @@
+# ocr_cache.py
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from config import OCR_CACHE_PATH, OCR_CACHE_MAX_MB
+
+# -----------------------------
+# Cache Keys
+# -----------------------------
+def _make_key(digest: str, *params) -> str:
+    """Combine a content digest with the OCR parameters that affect the output."""
+    return hashlib.sha256("|".join([digest, *map(str, params)]).encode("utf-8")).hexdigest()
+
+def hash_file(path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's bytes, read in blocks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def hash_image(image) -> str:
+    """SHA-256 of a rendered page's pixels, mode and size."""
+    h = hashlib.sha256(f"{image.mode}:{image.size}".encode("utf-8"))
+    h.update(image.tobytes())
+    return h.hexdigest()
+
+def document_key(pdf_path: str, *params) -> str:
+    return _make_key(hash_file(pdf_path), *params)
+
+def page_key(image, *params) -> str:
+    return _make_key(hash_image(image), *params)
+
+def text_key(text: str, *params) -> str:
+    """Key for a page taken from the PDF's embedded text layer."""
+    return _make_key(hashlib.sha256(text.encode("utf-8")).hexdigest(), "text_layer", *params)
+
+# -----------------------------
+# Persistent Cache
+# -----------------------------
+class OCRCache:
+    """
+    Persistent OCR results keyed by content hash.
+    - documents: PDF hash -> ordered page keys, lets unchanged PDFs skip rendering entirely
+    - pages: page content hash (rendered pixels or text layer) -> page record ({"text": ..., "source": ...})
+    Pages are evicted least-recently-used once the stored size exceeds max_mb,
+    together with the documents that reference them.
+    The stored size is kept as a running total, and page hits only note their
+    use time in memory; those are written in batches (flush()).
+    """
+
+    TOUCH_BATCH = 256  # page hits buffered before their last_used updates are written
+
+    def __init__(self, path: str = OCR_CACHE_PATH, max_mb: int = OCR_CACHE_MAX_MB):
+        self.path = path
+        self.max_bytes = max_mb * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                key TEXT PRIMARY KEY, record TEXT NOT NULL,
+                size INTEGER NOT NULL, last_used REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS pages_last_used ON pages(last_used);
+            CREATE TABLE IF NOT EXISTS documents (
+                key TEXT PRIMARY KEY, page_keys TEXT NOT NULL, last_used REAL NOT NULL);
+            """
+        )
+        self._conn.commit()
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        self._touched = {}  # page key -> last use not yet written
+
+    def get_page(self, key: str):
+        """Return the cached page record or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT record FROM pages WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[key] = time.time()
+            if len(self._touched) >= self.TOUCH_BATCH:
+                self._flush_touched()
+            return json.loads(row[0])
+
+    def put_page(self, key: str, record: dict):
+        record_json = json.dumps(record, ensure_ascii=False)
+        size = len(record_json.encode("utf-8"))
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM pages WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (key, record, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, record_json, size, time.time())
+            )
+            self._conn.commit()
+            self._touched.pop(key, None)
+            self._total += size - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def flush(self):
+        """Write buffered page use times."""
+        with self._lock:
+            self._flush_touched()
+
+    def _flush_touched(self):
+        if not self._touched:
+            return
+        self._conn.executemany("UPDATE pages SET last_used = ? WHERE key = ?",
+                               [(t, k) for k, t in self._touched.items()])
+        self._conn.commit()
+        self._touched.clear()
+
+    def get_document(self, key: str):
+        """
+        Return the ordered page records of a fully cached document, or None.
+        Counts as a miss if any of its pages has been evicted.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT page_keys FROM documents WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            page_keys = json.loads(row[0])
+            records = []
+            for k in page_keys:
+                page_row = self._conn.execute("SELECT record FROM pages WHERE key = ?", (k,)).fetchone()
+                if page_row is None:
+                    # A page was evicted (by another process); the entry can never hit again
+                    self._conn.execute("DELETE FROM documents WHERE key = ?", (key,))
+                    self._conn.commit()
+                    return None
+                records.append(json.loads(page_row[0]))
+            now = time.time()
+            self._conn.execute("UPDATE documents SET last_used = ? WHERE key = ?", (now, key))
+            self._touched.update((k, now) for k in page_keys)
+            self._flush_touched()
+            self.hits += len(records)
+            return records
+
+    def put_document(self, key: str, page_keys: list):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (key, page_keys, last_used) VALUES (?, ?, ?)",
+                (key, json.dumps(page_keys), time.time())
+            )
+            self._conn.commit()
+
+    def size_bytes(self) -> int:
+        return self._total
+
+    def _evict(self):
+        """
+        Drop least-recently-used pages until the cache is under its size limit,
+        with the documents that list them (caller holds the lock).
+        """
+        self._flush_touched()
+        # Re-count: other processes may share the cache file
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            self._total = total
+            return
+        # Evict down to 90% so we don't pay for an eviction on every insert
+        target = int(self.max_bytes * 0.9)
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM pages ORDER BY last_used"):
+            if total <= target:
+                break
+            victims.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM pages WHERE key = ?", victims)
+        evicted = {key for key, in victims}
+        stale = [(key,) for key, page_keys in self._conn.execute("SELECT key, page_keys FROM documents")
+                 if not evicted.isdisjoint(json.loads(page_keys))]
+        self._conn.executemany("DELETE FROM documents WHERE key = ?", stale)
+        self._conn.commit()
+        self._total = total
+        self.evictions += len(victims)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "size_mb": self.size_bytes() / (1024 * 1024)
+        }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_ocr_cache() -> OCRCache:
+    """Return the process-wide OCR cache, opening it on first use (thread-safe)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = OCRCache()
+    return _cache
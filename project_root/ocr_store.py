@@ -0,0 +1,104 @@
+# ocr_store.py
+import os
+import re
+import json
+import mmap
+import struct
+from pathlib import Path
+
+# -----------------------------
+# Packed OCR Format
+# -----------------------------
+# One file per document instead of one .txt per page:
+#
+#   MAGIC (8 bytes) | header length (uint32 LE) | header JSON | page text blob
+#
+# The header holds the offset table: for every page its byte offset/length
+# into the blob plus per-page metadata (extraction source, OCR confidence...).
+# Readers mmap the file, parse the header once and slice page texts out of
+# the mapping, so reading a document costs one open() however many pages it has.
+
+PACK_MAGIC = b"OCRPACK1"
+PACK_SUFFIX = ".ocrpack"
+_LEN = struct.Struct("<I")
+
+def pack_path(pdf_output_dir, pdf_name: str) -> Path:
+    return Path(pdf_output_dir) / f"{pdf_name}{PACK_SUFFIX}"
+
+def write_packed(pdf_output_dir, pdf_name: str, pages: list) -> Path:
+    """
+    Write a document's pages to <pdf>.ocrpack.
+    pages: dicts with "page_number" and "text"; every other key is kept as page metadata.
+    The file is written to a temp name and renamed, so readers never see a partial pack.
+    """
+    entries = []
+    blobs = []
+    offset = 0
+    for page in sorted(pages, key=lambda p: p["page_number"]):
+        data = page["text"].encode("utf-8")
+        meta = {k: v for k, v in page.items() if k != "text"}
+        entries.append({**meta, "offset": offset, "length": len(data)})
+        blobs.append(data)
+        offset += len(data)
+
+    header = json.dumps({"doc_id": pdf_name, "pages": entries}, ensure_ascii=False).encode("utf-8")
+    path = pack_path(pdf_output_dir, pdf_name)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(PACK_MAGIC)
+        f.write(_LEN.pack(len(header)))
+        f.write(header)
+        for data in blobs:
+            f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+def iter_packed_pages(path):
+    """Yield page dicts (metadata + "text") from a .ocrpack file in page order."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:len(PACK_MAGIC)] != PACK_MAGIC:
+                raise ValueError(f"Not an OCR pack file: {path}")
+            (header_len,) = _LEN.unpack_from(mm, len(PACK_MAGIC))
+            header_start = len(PACK_MAGIC) + _LEN.size
+            header = json.loads(mm[header_start:header_start + header_len].decode("utf-8"))
+            blob_start = header_start + header_len
+            for entry in header["pages"]:
+                start = blob_start + entry["offset"]
+                text = mm[start:start + entry["length"]].decode("utf-8")
+                meta = {k: v for k, v in entry.items() if k not in ("offset", "length")}
+                yield {**meta, "text": text}
+
+# -----------------------------
+# Reading Either Layout
+# -----------------------------
+def iter_document_pages(pdf_folder):
+    """
+    Yield the pages of one OCR'd document, from its .ocrpack if present,
+    otherwise from the per-page <pdf>_p<N>_c1.txt files (plus <pdf>_pages.json metadata).
+    Each page dict has "page_number", "text" and "stem" (the <pdf>_p<N>_c1 name
+    chunk ids are derived from), plus any stored page metadata.
+    """
+    pdf_folder = Path(pdf_folder)
+    pdf_name = pdf_folder.name
+    packed = pack_path(pdf_folder, pdf_name)
+    if packed.exists():
+        for page in iter_packed_pages(packed):
+            yield {**page, "stem": f"{pdf_name}_p{page['page_number']}_c1"}
+        return
+
+    page_meta = {}
+    manifest_file = pdf_folder / f"{pdf_name}_pages.json"
+    if manifest_file.exists():
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            page_meta = {p["page_number"]: p for p in json.load(f)}
+
+    text_files = sorted([f for f in os.listdir(pdf_folder) if f.endswith(".txt")])
+    for txt_file in text_files:
+        stem = txt_file.split(".txt")[0]
+        page_number = int(re.search(r"_p(\d+)_", txt_file).group(1))
+        with open(pdf_folder / txt_file, "r", encoding="utf-8") as f:
+            text = f.read().strip()
+        yield {**page_meta.get(page_number, {}), "page_number": page_number, "text": text, "stem": stem}
@@ -4,10 +4,12 @@ from pathlib import Path
 import shutil
 import streamlit as st
 from ocr import ocr_pdf
-from chunking import chunk_all_pdfs
-from embeddings import build_faiss_from_ocr
-from graph import build_graph
+from chunking import chunk_pdf_texts
+from incremental_index import IncrementalIndex
+from graph import replace_document_in_graph
 from entities import enrich_graph_with_entities
+from sharded_index import document_shard_path
+from config import OCR_CHUNKS_FOLDER, CHUNK_STORE_PATH, FAISS_NUM_SHARDS
 
 UPLOAD_FOLDER = "uploaded_pdfs"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -25,30 +27,36 @@ def update_knowledge_base(uploaded_file, chunk_method="sentence"):
     1. Save PDF
     2. Run OCR
     3. Chunk text
-    4. Update FAISS index
+    4. Add (or replace) the document in the FAISS index
     5. Update Neo4j graph
     6. Enrich graph with entities
+    Only the uploaded document is chunked, embedded and linked; the rest of
+    the knowledge base is left as is. With FAISS_NUM_SHARDS > 1 the document
+    goes to its shard, which requires a shard_by="doc" index. The index is
+    opened first, so an index that cannot be updated (HNSW, shard_by="batch")
+    raises ValueError before anything is saved or OCR'd.
     """
+    doc_id = Path(uploaded_file.name).stem
+    index = IncrementalIndex(document_shard_path(doc_id) if FAISS_NUM_SHARDS > 1 else CHUNK_STORE_PATH)
+
     st.info(f"Saving uploaded file: {uploaded_file.name}")
     pdf_path = save_uploaded_pdf(uploaded_file)
 
     st.info("Performing OCR...")
     ocr_pdf(pdf_path)
 
-    st.info("Chunking PDF...")
-    chunks = chunk_all_pdfs(method=chunk_method)
-    st.success(f"✅ Total chunks prepared: {len(chunks)}")
-
-    st.info("Building/Updating embeddings (FAISS)...")
-    build_faiss_from_ocr()
-    st.success("✅ FAISS index updated")
+    st.info("Chunking PDF & updating embeddings (FAISS)...")
+    chunks = chunk_pdf_texts(str(Path(OCR_CHUNKS_FOLDER) / doc_id), method=chunk_method)
+    removed, added = index.replace_document(doc_id, chunks)
+    index.save()
+    st.success(f"✅ FAISS index updated: {added} chunks added, {removed} replaced ({len(index)} total)")
 
     st.info("Updating Neo4j graph...")
-    build_graph(chunks)
+    replace_document_in_graph(doc_id, chunks)
     st.success("✅ Graph updated with new chunks")
 
     st.info("Extracting entities and enriching graph...")
-    enrich_graph_with_entities()
+    enrich_graph_with_entities(chunks)
     st.success("✅ Entities extracted and graph enriched")
 
     st.balloons()
@@ -0,0 +1,63 @@
+# serving_index.py
+import threading
+from collections import namedtuple
+from config import CHUNK_STORE_PATH, FAISS_SERVE_MMAP, INDEX_RELOAD_INTERVAL_S
+from embeddings import current_snapshot, load_faiss_index
+
+# -----------------------------
+# Hot-Reloading Index (Read-Copy-Update)
+# -----------------------------
+# A query takes one IndexSnapshot and uses its index and metadata from start
+# to finish. A reload loads the newly published snapshot completely, off to
+# the side, then publishes it by swapping a single reference: queries already
+# running keep the snapshot they hold (no locks on the query path), new
+# queries get the new one, and the old snapshot is freed once the last query
+# holding it drops its reference.
+
+IndexSnapshot = namedtuple("IndexSnapshot", ["version", "index", "metadata"])
+
+class ServingIndex:
+    """The query process's view of the published index, following new snapshots as ingestion publishes them."""
+
+    def __init__(self, path: str = CHUNK_STORE_PATH, mmap: bool = FAISS_SERVE_MMAP,
+                 reload_interval: float = INDEX_RELOAD_INTERVAL_S):
+        self.path = path
+        self.mmap = mmap
+        self.reload_interval = reload_interval
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._snapshot = self._load(current_snapshot(path))
+        self._watcher = None
+        if reload_interval > 0:
+            self._watcher = threading.Thread(target=self._watch, name="index-reload", daemon=True)
+            self._watcher.start()
+
+    def _load(self, version) -> IndexSnapshot:
+        index, metadata = load_faiss_index(self.path, mmap=self.mmap, snapshot=version)
+        return IndexSnapshot(version, index, metadata)
+
+    def current(self) -> IndexSnapshot:
+        """The snapshot to run one query against; never waits for a reload."""
+        return self._snapshot
+
+    def reload(self) -> bool:
+        """Switch to the published snapshot if it differs from the one being served. Returns whether it switched."""
+        with self._reload_lock:
+            version = current_snapshot(self.path)
+            if version is None or version == self._snapshot.version:
+                return False
+            snapshot = self._load(version)
+            self._snapshot = snapshot  # one reference swap: index and metadata change together
+        print(f"Serving index snapshot {version} ({len(snapshot.metadata)} chunks)")
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(self.reload_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"Index reload failed, still serving {self._snapshot.version}: {e}")
+
+    def close(self):
+        """Stop watching for new snapshots."""
+        self._stop.set()
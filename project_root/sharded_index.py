@@ -0,0 +1,226 @@
+# sharded_index.py
+import os
+import json
+import zlib
+import heapq
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from config import (
+    VECTOR_DIM,
+    INGEST_BATCH_SIZE,
+    CHUNK_STORE_PATH,
+    EMBEDDING_CACHE_ENABLED,
+    DEDUP_ENABLED,
+    FAISS_INDEX_TYPE,
+    FAISS_TRAIN_SIZE,
+    FAISS_NUM_SHARDS,
+    FAISS_SHARD_BY,
+    FAISS_SEARCH_THREADS,
+    FAISS_SERVE_MMAP,
+    FAISS_RERANK,
+    INDEX_RELOAD_INTERVAL_S
+)
+from chunking import iter_chunks, iter_batches, list_pdf_dirs
+from dedup import ChunkDeduplicator
+from embedding_cache import get_embedding_cache
+from embeddings import FaissIndexBuilder, encode_texts, save_faiss_index, search_vectors
+from serving_index import ServingIndex
+
+# -----------------------------
+# Sharded FAISS Index
+# -----------------------------
+# The corpus is split over num_shards independent indexes, each its own
+# snapshot root under <path>/shards/shard_NNN (published, hot-reloaded and
+# rebuilt on its own). A query is encoded once, searched on every shard in
+# parallel (FAISS releases the GIL during search) and the per-shard top-k
+# lists are merged by distance.
+#   shard_by="doc"   - shard = crc32(doc_id) % num_shards; a document always
+#                      lands on the same shard, so one shard can be rebuilt
+#                      (or a document updated) on its own. Chunks are
+#                      deduplicated per shard, so provenance never names a
+#                      document of another shard
+#   shard_by="batch" - ingestion batches go round-robin; shards stay evenly
+#                      sized, but can only be rebuilt all together
+
+SHARDS_DIR = "shards"
+SHARDS_FILE = "shards.json"
+
+def shard_of(doc_id: str, num_shards: int) -> int:
+    """Shard a document belongs to under shard_by="doc" (stable across runs and processes)."""
+    return zlib.crc32(doc_id.encode("utf-8")) % num_shards
+
+def shard_path(shard: int, path: str = CHUNK_STORE_PATH) -> str:
+    return os.path.join(path, SHARDS_DIR, f"shard_{shard:03d}")
+
+def read_shard_layout(path: str = CHUNK_STORE_PATH) -> dict:
+    """{"num_shards": ..., "shard_by": ...} as written by build_sharded_index."""
+    layout_file = os.path.join(path, SHARDS_DIR, SHARDS_FILE)
+    if not os.path.exists(layout_file):
+        raise FileNotFoundError(f"No sharded index at {path}")
+    with open(layout_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def document_shard_path(doc_id: str, path: str = CHUNK_STORE_PATH) -> str:
+    """
+    Snapshot root of the shard a document belongs to, for updating it in place
+    (incremental_index.IncrementalIndex). Only shard_by="doc" layouts place a
+    document deterministically; with shard_by="batch" raises ValueError.
+    """
+    layout = read_shard_layout(path)
+    if layout["shard_by"] != "doc":
+        raise ValueError("Documents can only be added to a shard_by='doc' index; "
+                         "rebuild the index (embeddings.build_faiss_from_ocr) to include new documents")
+    return shard_path(shard_of(doc_id, layout["num_shards"]), path)
+
+def _write_shard_layout(path: str, num_shards: int, shard_by: str):
+    shards_dir = os.path.join(path, SHARDS_DIR)
+    os.makedirs(shards_dir, exist_ok=True)
+    tmp_file = os.path.join(shards_dir, SHARDS_FILE + ".tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump({"num_shards": num_shards, "shard_by": shard_by}, f)
+    os.replace(tmp_file, os.path.join(shards_dir, SHARDS_FILE))
+
+def build_sharded_index(chunks, num_shards: int = FAISS_NUM_SHARDS, shard_by: str = FAISS_SHARD_BY,
+                        path: str = CHUNK_STORE_PATH, model=None, batch_size: int = INGEST_BATCH_SIZE,
+                        cache=None, index_type: str = FAISS_INDEX_TYPE, train_size: int = FAISS_TRAIN_SIZE,
+                        vector_dim: int = VECTOR_DIM, dedup: bool = DEDUP_ENABLED):
+    """
+    Embed chunks once and split them over num_shards indexes, then save each
+    shard as its own snapshot. With dedup, duplicates are collapsed within each
+    shard (shard_by="doc") or over the whole stream (shard_by="batch") and
+    recorded in the shards' provenance.
+    Returns a list of (index, ChunkStore), one per shard.
+    """
+    if shard_by not in ("doc", "batch"):
+        raise ValueError(f"Unknown shard_by {shard_by!r}; expected 'doc' or 'batch'")
+    builders = [FaissIndexBuilder(vector_dim, index_type, train_size) for _ in range(num_shards)]
+    locations = []  # stream row -> (shard, row in shard), for provenance
+    deduplicators = []
+    if dedup and shard_by == "doc":
+        # A shard's kept chunks are added in stream order, so each deduplicator's
+        # rows are its shard's rows
+        deduplicators = [ChunkDeduplicator() for _ in range(num_shards)]
+        chunks = (kept for chunk in chunks
+                  for kept in deduplicators[shard_of(chunk["doc_id"], num_shards)].filter([chunk]))
+    elif dedup:
+        deduplicators = [ChunkDeduplicator()]
+        chunks = deduplicators[0].filter(chunks)
+
+    for batch_no, batch in enumerate(iter_batches(chunks, batch_size)):
+        vectors = encode_texts([chunk["text"] for chunk in batch], model=model, cache=cache)
+        if shard_by == "batch":
+            assigned = np.full(len(batch), batch_no % num_shards)
+        else:
+            assigned = np.array([shard_of(chunk["doc_id"], num_shards) for chunk in batch])
+        batch_locations = [None] * len(batch)
+        for shard in np.unique(assigned):
+            rows = np.flatnonzero(assigned == shard)
+            builder = builders[shard]
+            for k, i in enumerate(rows):
+                batch_locations[i] = (int(shard), len(builder) + k)
+            builder.add([batch[i] for i in rows], vectors[rows])
+        locations.extend(batch_locations)
+
+    shards = [builder.build() for builder in builders]
+    if dedup and shard_by == "doc":
+        for (_, metadata), deduplicator in zip(shards, deduplicators):
+            metadata.provenance = deduplicator.provenance
+    elif dedup:
+        for row, duplicates in deduplicators[0].provenance.items():
+            shard, shard_row = locations[row]
+            shards[shard][1].provenance[shard_row] = duplicates
+
+    for shard, (index, metadata) in enumerate(shards):
+        save_faiss_index(index, metadata, shard_path(shard, path))
+        print(f"Shard {shard}: {len(metadata)} chunks")
+    for n, deduplicator in enumerate(deduplicators):
+        print(f"Deduplication{f' (shard {n})' if shard_by == 'doc' else ''}: {deduplicator.stats()}")
+    _write_shard_layout(path, num_shards, shard_by)
+    return shards
+
+def rebuild_shard(shard: int, path: str = CHUNK_STORE_PATH, method: str = "sentence", chunk_size: int = 500,
+                  use_cache: bool = EMBEDDING_CACHE_ENABLED, index_type: str = FAISS_INDEX_TYPE,
+                  dedup: bool = DEDUP_ENABLED):
+    """
+    Re-chunk and re-embed only the documents of one doc-hashed shard and
+    publish it as that shard's new snapshot; the other shards are untouched.
+    Deduplicated within the shard, as build_sharded_index does.
+    Returns (index, metadata) of the shard.
+    """
+    layout = read_shard_layout(path)
+    if layout["shard_by"] != "doc":
+        raise ValueError("Only shard_by='doc' shards can be rebuilt one at a time")
+    num_shards = layout["num_shards"]
+    if not 0 <= shard < num_shards:
+        raise ValueError(f"Shard {shard} out of range (index has {num_shards})")
+
+    pdf_dirs = [d for d in list_pdf_dirs() if shard_of(os.path.basename(d), num_shards) == shard]
+    builder = FaissIndexBuilder(index_type=index_type)
+    cache = get_embedding_cache() if use_cache else None
+    chunks = iter_chunks(method=method, chunk_size=chunk_size, pdf_dirs=pdf_dirs)
+    deduplicator = ChunkDeduplicator() if dedup else None
+    if deduplicator is not None:
+        chunks = deduplicator.filter(chunks)
+    for batch in iter_batches(chunks):
+        builder.add(batch, encode_texts([chunk["text"] for chunk in batch], cache=cache))
+    index, metadata = builder.build()
+    if deduplicator is not None:
+        metadata.provenance = deduplicator.provenance
+    version = save_faiss_index(index, metadata, shard_path(shard, path))
+    print(f"Rebuilt shard {shard} from {len(pdf_dirs)} documents: {len(metadata)} chunks ({version})")
+    return index, metadata
+
+def search_shards(shards, query_embeddings, top_k: int = 5, executor=None, nprobe=None, ef_search=None,
+                  rerank: bool = FAISS_RERANK, chunk_filter=None) -> list:
+    """
+    Search every (index, metadata) shard for each query row and merge the
+    per-shard top-k lists into one top-k per query (smallest L2 distance first,
+    as each shard's list already is).
+    With an executor the shards are searched concurrently. chunk_filter is
+    compiled per shard against that shard's metadata.
+    """
+    def search_one(shard):
+        index, metadata = shard
+        if index.ntotal == 0:
+            return [[] for _ in query_embeddings]
+        return search_vectors(query_embeddings, index, metadata, top_k, nprobe, ef_search, rerank, chunk_filter)
+
+    per_shard = list(executor.map(search_one, shards) if executor is not None else map(search_one, shards))
+    return [
+        list(islice(heapq.merge(*(hits[q] for hits in per_shard), key=lambda hit: hit["score"]), top_k))
+        for q in range(len(query_embeddings))
+    ]
+
+class ShardedIndex:
+    """The query process's view of a sharded index: one hot-reloading ServingIndex per shard, searched in parallel."""
+
+    def __init__(self, path: str = CHUNK_STORE_PATH, mmap: bool = FAISS_SERVE_MMAP,
+                 reload_interval: float = INDEX_RELOAD_INTERVAL_S, threads: int = FAISS_SEARCH_THREADS):
+        layout = read_shard_layout(path)
+        self.shards = [ServingIndex(shard_path(shard, path), mmap=mmap, reload_interval=reload_interval)
+                       for shard in range(layout["num_shards"])]
+        self._executor = ThreadPoolExecutor(max_workers=max(1, min(threads, len(self.shards))),
+                                            thread_name_prefix="shard-search")
+
+    def __len__(self):
+        return sum(len(shard.current().metadata) for shard in self.shards)
+
+    def search_batch(self, queries, top_k: int = 5, model=None, nprobe=None, ef_search=None,
+                     rerank: bool = FAISS_RERANK, chunk_filter=None) -> list:
+        """Like embeddings.search_faiss_batch, over all shards."""
+        if not len(queries):
+            return []
+        query_embeddings = encode_texts(list(queries), model=model)
+        snapshots = [shard.current() for shard in self.shards]
+        return search_shards([(s.index, s.metadata) for s in snapshots], query_embeddings, top_k,
+                             self._executor, nprobe, ef_search, rerank, chunk_filter)
+
+    def search(self, query: str, top_k: int = 5, model=None, nprobe=None, ef_search=None,
+               rerank: bool = FAISS_RERANK, chunk_filter=None) -> list:
+        return self.search_batch([query], top_k, model, nprobe, ef_search, rerank, chunk_filter)[0]
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+        self._executor.shutdown(wait=False)
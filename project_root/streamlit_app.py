@@ -1,6 +1,6 @@
 # streamlit_app.py
 import streamlit as st
-from main import chunk_all_pdfs, build_faiss_from_ocr, build_graph, enrich_graph_with_entities, answer_query
+from main import build_faiss_from_ocr, build_graph, enrich_graph_with_entities, answer_query
 from config import CHUNKING_METHODS
 from pdf_uploader import update_knowledge_base
 
@@ -73,16 +73,12 @@ st.sidebar.markdown("---")
 # Full ingestion button
 if st.sidebar.button("Run Full Ingestion Pipeline"):
     with st.spinner("🚀 Running ingestion pipeline... This may take a few minutes."):
-        st.info("Chunking PDFs...")
-        chunks = chunk_all_pdfs(method=chunk_method)
-        st.success(f"✅ Total chunks prepared: {len(chunks)}")
-
-        st.info("Building embeddings (FAISS)...")
-        index, metadata = build_faiss_from_ocr()
+        st.info("Chunking PDFs & building embeddings (FAISS)...")
+        index, metadata = build_faiss_from_ocr(method=chunk_method)
         st.success(f"✅ FAISS index created with {len(metadata)} chunks")
 
         st.info("Ingesting chunks into Neo4j...")
-        build_graph(chunks)
+        build_graph(metadata.all_chunks())
         st.success("✅ Neo4j graph populated")
 
         st.info("Extracting entities & enriching graph...")
@@ -1,6 +1,6 @@
 # streamlit_app.py
 import streamlit as st
-from main import chunk_all_pdfs, build_faiss_from_ocr, build_graph, enrich_graph_with_entities, answer_query
+from main import build_faiss_from_ocr, build_graph, enrich_graph_with_entities, answer_query
 from config import CHUNKING_METHODS
 
 # -----------------------------
@@ -98,16 +98,12 @@ st.markdown("Ask questions based on your PDF documents (supports scanned & handw
 if ingest_docs:
     with st.spinner("🚀 Running ingestion pipeline... This may take a few minutes."):
         # 0️⃣ OCR is assumed done separately
-        st.info("Chunking PDFs...")
-        chunks = chunk_all_pdfs(method=chunk_method)
-        st.success(f"✅ Total chunks prepared: {len(chunks)}")
-
-        st.info("Building embeddings (FAISS)...")
-        index, metadata = build_faiss_from_ocr()
+        st.info("Chunking PDFs & building embeddings (FAISS)...")
+        index, metadata = build_faiss_from_ocr(method=chunk_method)
         st.success(f"✅ FAISS index created with {len(metadata)} chunks")
 
         st.info("Ingesting chunks into Neo4j...")
-        build_graph(chunks)
+        build_graph(metadata.all_chunks())
         st.success("✅ Neo4j graph populated")
 
         st.info("Extracting entities & enriching graph...")